@@ -0,0 +1,52 @@
+from collections import Counter
+
+HIGH_RISK_LEVELS = ("High", "Critical")
+HISTOGRAM_BIN_WIDTH = 10
+
+
+# Running Dashboard Aggregates
+class RiskAggregates:
+    """Running counts per risk level, score sum and score histogram.
+
+    Every update is O(1), so reading the dashboard totals costs the same
+    regardless of how many assessments exist.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.level_counts = Counter()
+        self.score_sum = 0
+        self.histogram = Counter()
+
+    @staticmethod
+    def bin_for(score):
+        return int(score // HISTOGRAM_BIN_WIDTH) * HISTOGRAM_BIN_WIDTH
+
+    def add(self, score, level, count=1):
+        self.level_counts[level] += count
+        self.score_sum += score * count
+        self.histogram[self.bin_for(score)] += count
+
+    def remove(self, score, level):
+        self.add(score, level, count=-1)
+        self.level_counts += Counter()
+        self.histogram += Counter()
+
+    def replace(self, old_score, old_level, score, level):
+        self.remove(old_score, old_level)
+        self.add(score, level)
+
+    @property
+    def total(self):
+        return sum(self.level_counts.values())
+
+    @property
+    def high_risk(self):
+        return sum(self.level_counts[level] for level in HIGH_RISK_LEVELS)
+
+    @property
+    def average_score(self):
+        total = self.total
+        return self.score_sum / total if total else 0
@@ -0,0 +1,362 @@
+"""Asyncio JSON API for programmatic submission and scoring.
+
+Usage:
+    python api.py --port 8600 --db assessments.db
+
+Endpoints:
+    GET  /health
+    POST /score                  score one assessment without storing it
+    POST /assessments            validate, score and store one assessment
+    POST /assessments/batch      validate, score and store a list of assessments
+    GET  /assessments            paginated list; query parameters limit, offset,
+                                 q (full-text search), risk_level, client_id,
+                                 date_from, date_to, sort (date|score|relevance)
+                                 and order (asc|desc)
+    GET  /assessments/{id}
+    GET  /clients/{client_id}    latest assessment of one client
+    GET  /export.ndjson          stream every assessment as NDJSON
+
+Validation uses the wizard's rules. Batch scoring runs in a process pool,
+and blocking store calls run in worker threads, so the event loop is never
+blocked.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import suppress
+from datetime import date, datetime
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from importer import IMPORT_CHUNK_SIZE, normalize_row, process_chunk, reject_duplicates
+from rescore import RescoreJob
+from scoring import with_risk, assessment_risk
+from storage import (
+    DEFAULT_DB_PATH, DEFAULT_DUPLICATE_POLICY, DUPLICATE_POLICIES, SORT_COLUMNS,
+    DuplicateClientError, SharedAssessmentStore, SQLiteAssessmentStore,
+)
+from validation import validate_assessment
+
+logger = logging.getLogger("risk_app.api")
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+EXPORT_BATCH_SIZE = 500
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, **details):
+        super().__init__(message)
+        self.status = status
+        self.payload = {"error": message, **details}
+
+
+class Response:
+    """A JSON payload, or a `stream` async iterator of bytes sent chunked
+    (or, to HTTP/1.0 clients, unchunked until the connection closes)"""
+
+    def __init__(self, payload=None, status=200, stream=None, content_type="application/json"):
+        self.payload = payload
+        self.status = status
+        self.stream = stream
+        self.content_type = content_type
+
+
+def risk_payload(record, record_id=None):
+    payload = {
+        "client_id": record["client_id"],
+        "risk_score": record["risk_score"],
+        "risk_level": record["risk_level"],
+        "risk_factors": record["risk_factors"],
+        "rule_version": record["rule_version"],
+    }
+    if record_id is not None:
+        payload["id"] = record_id
+    return payload
+
+
+def _timestamp():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+# Application
+class AssessmentAPI:
+    def __init__(self, store, workers=None):
+        self.store = store
+        # spawn keeps pool workers independent of the event loop's threads
+        self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    # Routing
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        query = parse_qs(url.query)
+
+        if path == "/health" and method == "GET":
+            return Response({"status": "ok"})
+        if path == "/score" and method == "POST":
+            return self.score(self._json(body))
+        if path == "/assessments" and method == "POST":
+            return await self.submit(self._json(body))
+        if path == "/assessments" and method == "GET":
+            return await self.list_assessments(query)
+        if path == "/assessments/batch" and method == "POST":
+            return await self.submit_batch(self._json(body))
+        if path.startswith("/assessments/") and method == "GET":
+            return await self.get_assessment(path.rsplit("/", 1)[1])
+        if path.startswith("/clients/") and method == "GET":
+            return await self.get_client(unquote(path.split("/", 2)[2]))
+        if path == "/export.ndjson" and method == "GET":
+            return Response(stream=self.export_stream(), content_type="application/x-ndjson")
+        if path in ("/health", "/score", "/assessments", "/assessments/batch", "/export.ndjson"):
+            raise HTTPError(405, "Method not allowed")
+        raise HTTPError(404, "Not found")
+
+    @staticmethod
+    def _json(body):
+        try:
+            return json.loads(body or b"null")
+        except ValueError:
+            raise HTTPError(400, "Request body is not valid JSON")
+
+    @staticmethod
+    def _validated(data):
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Expected a JSON object")
+        record = normalize_row(data)
+        errors = validate_assessment(record)
+        if errors:
+            raise HTTPError(422, "Validation failed", errors=errors)
+        return record
+
+    # Handlers
+    def score(self, data):
+        record = with_risk(self._validated(data))
+        return Response(risk_payload(record))
+
+    async def submit(self, data):
+        record = self._validated(data)
+        record["timestamp"] = record["timestamp"] or _timestamp()
+        with_risk(record)
+        try:
+            record_id = await asyncio.to_thread(self.store.add, record)
+        except DuplicateClientError as e:
+            raise HTTPError(409, str(e), client_ids=e.client_ids)
+        return Response(risk_payload(record, record_id), status=201)
+
+    async def submit_batch(self, data):
+        if isinstance(data, dict):
+            data = data.get("assessments")
+        if not isinstance(data, list):
+            raise HTTPError(400, "Expected a JSON array of assessments")
+
+        rows, errors = [], []
+        for number, item in enumerate(data, start=1):
+            if isinstance(item, dict):
+                rows.append((number, normalize_row(item)))
+            else:
+                errors.append((number, "", "Expected a JSON object"))
+
+        loop = asyncio.get_running_loop()
+        chunks = [rows[i:i + IMPORT_CHUNK_SIZE] for i in range(0, len(rows), IMPORT_CHUNK_SIZE)]
+        outcomes = await asyncio.gather(*(
+            loop.run_in_executor(self.pool, process_chunk, 0, [row for _, row in chunk])
+            for chunk in chunks
+        ))
+
+        accepted = []
+        for chunk, (valid, chunk_errors) in zip(chunks, outcomes):
+            # process_chunk numbers rows within the chunk from 1
+            rejected = {index for index, _, _ in chunk_errors}
+            errors.extend((chunk[index - 1][0], client_id, error) for index, client_id, error in chunk_errors)
+            numbers = [number for index, (number, _) in enumerate(chunk, start=1) if index not in rejected]
+            accepted.extend(zip(numbers, valid))
+
+        accepted, duplicates = await asyncio.to_thread(reject_duplicates, accepted, self.store)
+        errors.extend(duplicates)
+        timestamp = _timestamp()
+        for _, record in accepted:
+            record["timestamp"] = record["timestamp"] or timestamp
+        try:
+            ids = await asyncio.to_thread(self.store.add_many, [r for _, r in accepted]) if accepted else []
+        except DuplicateClientError as e:
+            # Another writer stored one of these clients after the check
+            raise HTTPError(409, str(e), client_ids=e.client_ids)
+
+        return Response({
+            "imported": len(accepted),
+            "rejected": len(errors),
+            "results": [dict(risk_payload(r, i), row=n) for (n, r), i in zip(accepted, ids)],
+            "errors": [{"row": n, "client_id": c, "error": e} for n, c, e in sorted(errors)],
+        })
+
+    async def list_assessments(self, query):
+        def one(name, default=None):
+            return query.get(name, [default])[-1]
+
+        try:
+            # SQLite treats a negative LIMIT as no limit at all
+            limit = min(max(int(one("limit", DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+            offset = max(int(one("offset", 0)), 0)
+            date_from = date.fromisoformat(one("date_from")) if one("date_from") else None
+            date_to = date.fromisoformat(one("date_to")) if one("date_to") else None
+        except ValueError:
+            raise HTTPError(400, "Invalid limit, offset or date")
+        sort = one("sort", "date")
+        if sort not in SORT_COLUMNS:
+            raise HTTPError(400, f"sort must be one of: {', '.join(SORT_COLUMNS)}")
+        filters = {
+            "risk_levels": [lvl for value in query.get("risk_level", []) for lvl in value.split(",") if lvl],
+            "client_id": one("client_id"),
+            "date_from": date_from,
+            "date_to": date_to,
+            "search": one("q"),
+        }
+        total = await asyncio.to_thread(self.store.count, **filters)
+        items = await asyncio.to_thread(
+            self.store.query, **filters, sort=sort, descending=one("order", "desc") != "asc",
+            limit=limit, offset=offset,
+        )
+        return Response({"total": total, "limit": limit, "offset": offset, "items": items})
+
+    async def get_assessment(self, record_id):
+        try:
+            record = await asyncio.to_thread(self.store.get, int(record_id))
+        except ValueError:
+            record = None
+        if record is None:
+            raise HTTPError(404, "Assessment not found")
+        return Response(record)
+
+    async def get_client(self, client_id):
+        record = await asyncio.to_thread(self.store.latest_for_client, client_id)
+        if record is None:
+            raise HTTPError(404, "Client not found")
+        return Response(record)
+
+    async def export_stream(self):
+        after_id = None
+        while True:
+            rows = await asyncio.to_thread(self.store.page, after_id, EXPORT_BATCH_SIZE, False)
+            if not rows:
+                return
+            yield "".join(json.dumps(r) + "\n" for r in rows).encode("utf-8")
+            after_id = rows[-1]["id"]
+
+    # HTTP/1.1
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self.write_response(writer, Response({"error": "Bad request"}, status=400), False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY_BYTES:
+                    await self.write_response(writer, Response({"error": "Invalid or too large body"}, status=413), False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                try:
+                    response = await self.dispatch(method.upper(), target, body)
+                except HTTPError as e:
+                    response = Response(e.payload, status=e.status)
+                except Exception:
+                    logger.exception("Unhandled error for %s %s", method, target)
+                    response = Response({"error": "Internal server error"}, status=500)
+                # HTTP/1.0 has no chunked encoding, so a streamed body ends
+                # when the connection closes
+                chunked = version != "HTTP/1.0"
+                if response.stream is not None and not chunked:
+                    keep_alive = False
+                await self.write_response(writer, response, keep_alive, chunked)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+    @staticmethod
+    async def write_response(writer, response, keep_alive, chunked=True):
+        head = [
+            f"HTTP/1.1 {response.status} {HTTPStatus(response.status).phrase}",
+            f"Content-Type: {response.content_type}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if response.stream is None:
+            body = json.dumps(response.payload).encode("utf-8")
+            head.append(f"Content-Length: {len(body)}")
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+            await writer.drain()
+            return
+        if chunked:
+            head.append("Transfer-Encoding: chunked")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        async for chunk in response.stream:
+            writer.write(f"{len(chunk):X}\r\n".encode("latin-1") + chunk + b"\r\n" if chunked else chunk)
+            await writer.drain()
+        if chunked:
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+
+
+async def serve(api, host="127.0.0.1", port=8600):
+    server = await asyncio.start_server(api.handle_connection, host, port, backlog=1024)
+    logger.info("Serving on http://%s:%s", host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Home Care Risk Assessment JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite database path")
+    parser.add_argument("--workers", type=int, default=None, help="Scoring worker processes")
+    parser.add_argument(
+        "--duplicates", choices=DUPLICATE_POLICIES, default=DEFAULT_DUPLICATE_POLICY,
+        help="What to do with an already stored client_id (default: $RISK_APP_DUPLICATES or append)",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    store = SharedAssessmentStore(SQLiteAssessmentStore(args.db, scorer=assessment_risk, duplicates=args.duplicates))
+    RescoreJob(store).start()
+    api = AssessmentAPI(store, args.workers)
+    try:
+        asyncio.run(serve(api, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+"""Append-only columnar archive for historical assessments.
+
+Each fixed-width field is a flat NumPy column in its own file, and free
+text lives in one shared UTF-8 heap addressed by per-field offset and
+length columns. Opening an archive only memory-maps the files, so start-up
+cost does not depend on its size, and readers such as aggregates() and
+rescore() touch only the columns they use.
+
+Layout of an archive directory:
+    manifest.json       row count, heap size, rule versions and result files
+    <column>.bin        one fixed-width column per file
+    <result>.<n>.bin    risk result columns as of re-scoring generation n
+    <text>.off/.len     heap offset and byte length of a text field
+    heap.bin            UTF-8 text of every text field
+    writer.lock         held by the process appending or re-scoring
+
+Every answer round-trips. Risk factors and input hashes are not archived;
+assessment_risk() recomputes them when needed. The manifest is replaced
+atomically after the column files are written, so it marks what is
+committed. Bytes past the committed length, left by an interrupted
+append, are ignored and truncated by the next append. Re-scoring writes
+a new generation of result files and the manifest switches to them in
+one step.
+"""
+import glob
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (Windows): only one process may write an archive
+    fcntl = None
+
+import numpy as np
+
+from aggregates import RiskAggregates
+from records import CODED_FIELDS, RISK_LEVEL_CHOICES, AssessmentRecord
+from scoring import RULES, SCORING_FIELDS, calculate_risk_scores_batch
+from validation import ASSESSMENT_FIELDS
+
+DEFAULT_ARCHIVE_PATH = os.environ.get("RISK_APP_ARCHIVE", "")
+ARCHIVE_FORMAT = 1
+ARCHIVE_CHUNK_SIZE = 10000
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Sentinels for missing values in the fixed-width columns
+NO_CODE = 255
+NO_AGE = -1
+NO_RULE_VERSION = 65535
+
+FIXED_COLUMNS = {
+    "id": np.dtype("<i8"),
+    "timestamp": np.dtype("<M8[s]"),
+    "age": np.dtype("<i2"),
+    "weight": np.dtype("<f8"),
+    **{field: np.dtype("u1") for field in CODED_FIELDS},
+    "risk_score": np.dtype("<f8"),
+    "risk_level": np.dtype("u1"),
+    "rule_version": np.dtype("<u2"),
+}
+# Columns rewritten by rescore(), named in the manifest by generation
+RESULT_COLUMNS = ("risk_score", "risk_level", "rule_version")
+# Free text kept in the heap; "extra" holds a JSON object of anything the
+# fixed columns cannot represent, so archiving is lossless
+TEXT_COLUMNS = (
+    "first_name", "last_name", "client_id", "height",
+    "diagnoses_details", "medication_details", "seizure_type", "additional_notes",
+    "extra",
+)
+OFFSET_DTYPE = np.dtype("<u8")
+LENGTH_DTYPE = np.dtype("<u4")
+_LEVEL_CODES = {level: i for i, level in enumerate(RISK_LEVEL_CHOICES)}
+
+
+def _weight_text(weight):
+    return str(int(weight) if weight.is_integer() else weight)
+
+
+def _parse_timestamp(text):
+    try:
+        parsed = datetime.strptime(text, TIMESTAMP_FORMAT)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.strftime(TIMESTAMP_FORMAT) == text else None
+
+
+class ColumnarArchive:
+    """Memory-mapped, append-only archive of assessments in columns"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        self.manifest = {
+            "format": ARCHIVE_FORMAT, "rows": 0, "heap_bytes": 0, "rule_versions": [], "generation": 0, "files": {},
+        }
+        self._manifest_mtime = None
+        self._maps = {}
+        self._heap = None
+        self._aggregates = None
+        self.refresh()
+
+    # Files
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def refresh(self):
+        """Pick up rows committed by another process since the last read"""
+        with self._lock:
+            try:
+                mtime = os.stat(self._file("manifest.json")).st_mtime_ns
+            except FileNotFoundError:
+                return
+            if mtime == self._manifest_mtime:
+                return
+            with open(self._file("manifest.json")) as f:
+                manifest = json.load(f)
+            if manifest.get("format") != ARCHIVE_FORMAT:
+                raise ValueError(f"Unsupported archive format: {manifest.get('format')}")
+            self.manifest = manifest
+            self._manifest_mtime = mtime
+            self._maps.clear()
+            self._heap = None
+            self._aggregates = None
+
+    def _fixed_file(self, name):
+        return self.manifest["files"].get(name, f"{name}.bin")
+
+    def _column_files(self):
+        files = {self._fixed_file(name): dtype for name, dtype in FIXED_COLUMNS.items()}
+        for name in TEXT_COLUMNS:
+            files[f"{name}.off"] = OFFSET_DTYPE
+            files[f"{name}.len"] = LENGTH_DTYPE
+        return files
+
+    def _map(self, file_name, dtype):
+        rows = self.manifest["rows"]
+        if not rows:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._file(file_name), dtype=dtype, mode="r", shape=(rows,))
+
+    def _write_manifest(self):
+        self.manifest["format"] = ARCHIVE_FORMAT
+        tmp = self._file("manifest.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp, self._file("manifest.json"))
+        self._manifest_mtime = os.stat(self._file("manifest.json")).st_mtime_ns
+        self._maps.clear()
+        self._heap = None
+        self._aggregates = None
+
+    @contextmanager
+    def _writing(self):
+        """Hold the archive's writer lock against this and other processes"""
+        with self._lock, open(self._file("writer.lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            # Another process may have committed while we waited
+            self.refresh()
+            yield
+
+    # Reading
+    def __len__(self):
+        return self.manifest["rows"]
+
+    def column(self, name):
+        """Read-only memory-mapped array of one fixed-width column"""
+        with self._lock:
+            if name not in self._maps:
+                self._maps[name] = self._map(self._fixed_file(name), FIXED_COLUMNS[name])
+            return self._maps[name]
+
+    def _heap_bytes(self):
+        with self._lock:
+            if self._heap is None:
+                size = self.manifest["heap_bytes"]
+                self._heap = (
+                    np.memmap(self._file("heap.bin"), dtype="u1", mode="r", shape=(size,)) if size
+                    else np.empty(0, dtype="u1")
+                )
+                for name in TEXT_COLUMNS:
+                    self._maps[f"{name}.off"] = self._map(f"{name}.off", OFFSET_DTYPE)
+                    self._maps[f"{name}.len"] = self._map(f"{name}.len", LENGTH_DTYPE)
+            return self._heap
+
+    def text(self, name, index):
+        """One value of a text column"""
+        heap = self._heap_bytes()
+        start = int(self._maps[f"{name}.off"][index])
+        return heap[start:start + int(self._maps[f"{name}.len"][index])].tobytes().decode("utf-8")
+
+    def texts(self, name, indices):
+        """Values of a text column at `indices`"""
+        return [self.text(name, i) for i in indices]
+
+    def _extra(self, index):
+        extra = self.text("extra", index)
+        return json.loads(extra) if extra else {}
+
+    def record(self, index):
+        """The assessment dict stored at row `index`"""
+        data = {name: self.text(name, index) for name in TEXT_COLUMNS if name != "extra"}
+        for field, choices in CODED_FIELDS.items():
+            code = int(self.column(field)[index])
+            data[field] = choices[code] if code != NO_CODE else ""
+        age = int(self.column("age")[index])
+        data["age"] = str(age) if age != NO_AGE else ""
+        weight = float(self.column("weight")[index])
+        data["weight"] = "" if np.isnan(weight) else _weight_text(weight)
+        timestamp = self.column("timestamp")[index]
+        data["timestamp"] = "" if np.isnat(timestamp) else timestamp.item().strftime(TIMESTAMP_FORMAT)
+        level = int(self.column("risk_level")[index])
+        if level != NO_CODE:
+            data["risk_score"] = float(self.column("risk_score")[index])
+            data["risk_level"] = RISK_LEVEL_CHOICES[level]
+        version = int(self.column("rule_version")[index])
+        if version != NO_RULE_VERSION:
+            data["rule_version"] = self.manifest["rule_versions"][version]
+        record_id = int(self.column("id")[index])
+        if record_id >= 0:
+            data["id"] = record_id
+        # Raw values the columns could not hold override the decoded ones
+        data.update(self._extra(index))
+        return {field: data.pop(field) for field in ASSESSMENT_FIELDS} | data
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.record(index)
+
+    def aggregates(self):
+        """RiskAggregates over every archived result, reading only the risk columns"""
+        with self._lock:
+            if self._aggregates is None:
+                aggregates = RiskAggregates()
+                levels = self.column("risk_level")
+                scored = levels != NO_CODE
+                pairs = np.stack([levels[scored].astype(np.float64), self.column("risk_score")[scored]], axis=1)
+                if len(pairs):
+                    for (level, score), count in zip(*np.unique(pairs, axis=0, return_counts=True)):
+                        aggregates.add(float(score), RISK_LEVEL_CHOICES[int(level)], int(count))
+                self._aggregates = aggregates
+            return self._aggregates
+
+    # Writing
+    def _rule_version_code(self, version):
+        if version is None:
+            return NO_RULE_VERSION
+        versions = self.manifest["rule_versions"]
+        if version not in versions:
+            versions.append(version)
+        return versions.index(version)
+
+    def _encode(self, records):
+        """Column arrays and heap bytes for `records`"""
+        n = len(records)
+        columns = {name: np.empty(n, dtype=dtype) for name, dtype in FIXED_COLUMNS.items()}
+        texts = {name: [] for name in TEXT_COLUMNS}
+        for i, data in enumerate(records):
+            record = AssessmentRecord.from_dict(data)
+            extra = dict(record.extra or {})
+            for name in TEXT_COLUMNS[:-1]:
+                texts[name].append(getattr(record, name) or "")
+            for field in CODED_FIELDS:
+                code = getattr(record, field)
+                if type(code) is not int or code >= NO_CODE:
+                    code, extra[field] = NO_CODE, data.get(field, "")
+                columns[field][i] = code
+            if record.age is not None and record.age_text is None and 0 <= record.age < 2**15:
+                columns["age"][i] = record.age
+            else:
+                columns["age"][i] = NO_AGE
+                if data.get("age", ""):
+                    extra["age"] = data["age"]
+            if record.weight is not None and _weight_text(float(record.weight)) == data.get("weight"):
+                columns["weight"][i] = record.weight
+            else:
+                columns["weight"][i] = np.nan
+                if data.get("weight", ""):
+                    extra["weight"] = data["weight"]
+            timestamp = _parse_timestamp(record.timestamp)
+            columns["timestamp"][i] = np.datetime64(timestamp, "s") if timestamp else np.datetime64("NaT")
+            if timestamp is None and record.timestamp:
+                extra["timestamp"] = record.timestamp
+            level = _LEVEL_CODES.get(data.get("risk_level"), NO_CODE) if record.risk_score is not None else NO_CODE
+            columns["risk_level"][i] = level
+            columns["risk_score"][i] = record.risk_score if level != NO_CODE else np.nan
+            columns["rule_version"][i] = self._rule_version_code(record.rule_version if level != NO_CODE else None)
+            columns["id"][i] = record.id if isinstance(record.id, int) else -1
+            texts["extra"].append(json.dumps(extra) if extra else "")
+
+        heap = bytearray()
+        base = self.manifest["heap_bytes"]
+        offsets = {}
+        for name, values in texts.items():
+            starts = np.empty(n, dtype=OFFSET_DTYPE)
+            lengths = np.empty(n, dtype=LENGTH_DTYPE)
+            for i, value in enumerate(values):
+                encoded = value.encode("utf-8")
+                starts[i] = base + len(heap)
+                lengths[i] = len(encoded)
+                heap += encoded
+            offsets[f"{name}.off"] = starts
+            offsets[f"{name}.len"] = lengths
+        return {self._fixed_file(name): array for name, array in columns.items()} | offsets, bytes(heap)
+
+    def _truncate_uncommitted(self):
+        """Drop what an interrupted append or re-score left behind (writer lock held)"""
+        rows = self.manifest["rows"]
+        for file_name, dtype in self._column_files().items():
+            if os.path.exists(self._file(file_name)):
+                os.truncate(self._file(file_name), rows * dtype.itemsize)
+        if os.path.exists(self._file("heap.bin")):
+            os.truncate(self._file("heap.bin"), self.manifest["heap_bytes"])
+        self._remove_stale_results()
+
+    def _remove_stale_results(self):
+        """Delete result files of generations the manifest no longer names"""
+        current = {self._fixed_file(name) for name in RESULT_COLUMNS}
+        for name in RESULT_COLUMNS:
+            for path in glob.glob(self._file(f"{name}.*bin")):
+                if os.path.basename(path) not in current:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        # Still mapped by a reader on a platform that forbids it; retried next write
+                        pass
+
+    def append(self, records, chunk_size=ARCHIVE_CHUNK_SIZE):
+        """Append assessment dicts in chunks, each committed by a manifest update.
+
+        Returns the number of rows appended.
+        """
+        appended = 0
+        chunk = []
+        with self._writing():
+            self._truncate_uncommitted()
+            for record in records:
+                chunk.append(record)
+                if len(chunk) == chunk_size:
+                    appended += self._append_chunk(chunk)
+                    chunk = []
+            if chunk:
+                appended += self._append_chunk(chunk)
+        return appended
+
+    def _append_chunk(self, records):
+        arrays, heap = self._encode(records)
+        for file_name, array in arrays.items():
+            with open(self._file(file_name), "ab") as f:
+                f.write(array.tobytes())
+        with open(self._file("heap.bin"), "ab") as f:
+            f.write(heap)
+        self.manifest["rows"] += len(records)
+        self.manifest["heap_bytes"] += len(heap)
+        self._write_manifest()
+        return len(records)
+
+    # Re-scoring
+    def _scoring_rows(self, start, stop):
+        """Lightweight dicts of SCORING_FIELDS for rows start..stop-1, read column by column"""
+        rows = [{} for _ in range(stop - start)]
+        ages = self.column("age")[start:stop]
+        weights = self.column("weight")[start:stop]
+        raw = (ages == NO_AGE) | np.isnan(weights)
+        for field, choices in CODED_FIELDS.items():
+            if field in SCORING_FIELDS:
+                codes = self.column(field)[start:stop]
+                raw |= codes == NO_CODE
+                for row, code in zip(rows, codes.tolist()):
+                    row[field] = choices[code] if code != NO_CODE else ""
+        for row, age, weight in zip(rows, ages.tolist(), weights.tolist()):
+            row["age"] = str(age) if age != NO_AGE else ""
+            row["weight"] = "" if weight != weight else _weight_text(weight)
+        for row, value in zip(rows, self.texts("diagnoses_details", range(start, stop))):
+            row["diagnoses_details"] = value
+        # Raw values the columns could not hold
+        for i in np.flatnonzero(raw).tolist():
+            rows[i].update({k: v for k, v in self._extra(start + i).items() if k in SCORING_FIELDS})
+        return rows
+
+    def rescore(self, rules=None, chunk_size=ARCHIVE_CHUNK_SIZE, progress=None):
+        """Recompute results stored under another rule version.
+
+        Only the scoring inputs and the three result columns are read. The
+        new result columns are written as the next generation of files and
+        the manifest switches to all three at once, so readers see either
+        every old result or every new one. Returns the number of results
+        recomputed.
+        """
+        rules = rules or RULES
+        with self._writing():
+            self._truncate_uncommitted()
+            rows = len(self)
+            if not rows:
+                return 0
+            current = self._rule_version_code(rules.version)
+            scores = np.array(self.column("risk_score"))
+            levels = np.array(self.column("risk_level"))
+            versions = np.array(self.column("rule_version"))
+            stale = np.flatnonzero(versions != current)
+            if not len(stale):
+                return 0
+            for done in range(0, len(stale), chunk_size):
+                indices = stale[done:done + chunk_size]
+                start, stop = int(indices[0]), int(indices[-1]) + 1
+                inputs = self._scoring_rows(start, stop)
+                results = calculate_risk_scores_batch([inputs[i - start] for i in indices.tolist()], rules)
+                scores[indices] = [score for score, _, _ in results]
+                levels[indices] = [_LEVEL_CODES[level] for _, level, _ in results]
+                if progress:
+                    progress(min(done + chunk_size, len(stale)), len(stale))
+            versions[stale] = current
+            generation = self.manifest["generation"] + 1
+            files = {name: f"{name}.{generation}.bin" for name in RESULT_COLUMNS}
+            for name, array in zip(RESULT_COLUMNS, (scores, levels, versions)):
+                with open(self._file(files[name]), "wb") as f:
+                    f.write(array.astype(FIXED_COLUMNS[name]).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+            self.manifest["generation"] = generation
+            self.manifest["files"] = {**self.manifest["files"], **files}
+            self._write_manifest()
+            self._remove_stale_results()
+            return len(stale)
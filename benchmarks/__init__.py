@@ -0,0 +1,15 @@
+"""Helpers shared by the benchmark and load-test scripts"""
+import os
+import subprocess
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "risk_app.py")
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(APP_PATH),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
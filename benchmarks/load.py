@@ -0,0 +1,286 @@
+"""Multi-session load test of rerun latency under concurrency.
+
+Usage:
+    python -m benchmarks.load --clinicians 20 --admins 5 --duration 60 -o load/HEAD.json
+    python -m benchmarks.load --compare load/base.json load/HEAD.json
+
+Every session is a Streamlit AppTest session running risk_app.py in this
+process, which plays the server: sessions share its cached store, draft
+queue and rescore job, and contend for the same interpreter, as the
+script threads of one `streamlit run` server do. No `streamlit run`
+server is started, so the numbers leave out its Tornado event loop,
+websocket framing and protobuf delta encoding, per-session script
+scheduling and browser rendering. They measure script reruns, which is
+where this app's time goes, not end-to-end page latency.
+
+The run uses its own scratch database in a new temporary directory.
+
+Clinician sessions walk home -> assessment wizard -> submit with seeded
+synthetic answers. Admin sessions page, sort and search the dashboard.
+The report has p50/p95/p99 latency per interaction, overall throughput
+and the process's memory growth, with the git revision, so runs from
+different revisions can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# The app reads its database path when storage is first imported, so point
+# it at this run's own scratch database before anything imports storage
+_DB_DIR = tempfile.mkdtemp(prefix="risk_load_")
+SCRATCH_DB_PATH = os.path.join(_DB_DIR, "assessments.db")
+os.environ["RISK_APP_DB"] = SCRATCH_DB_PATH
+
+from benchmarks import APP_PATH, git_revision  # noqa: E402
+from benchmarks.synthetic import generate_assessment, generate_assessments  # noqa: E402
+from scoring import assessment_risk, with_risk  # noqa: E402
+from storage import DEFAULT_DB_PATH, SQLiteAssessmentStore  # noqa: E402
+from validation import validate_assessment  # noqa: E402
+
+SESSION_TIMEOUT = 600
+SEARCH_TERMS = ["diabetes", "warfarin", "walker", "seizure", "Smith", "CL0001"]
+SORTS = ["Newest first", "Highest score", "Oldest first", "Lowest score"]
+
+
+def rss_bytes():
+    """Current resident set size of this process (peak RSS where /proc is missing)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _labeled(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+class Session:
+    """One simulated browser session recording (interaction, seconds) samples"""
+
+    def __init__(self, rng, samples, errors):
+        from streamlit.testing.v1 import AppTest
+
+        self.rng = rng
+        self.samples = samples
+        self.errors = errors
+        self.at = AppTest.from_file(APP_PATH, default_timeout=SESSION_TIMEOUT)
+
+    def step(self, name, action=None):
+        """Apply `action` to the widgets, rerun and time the rerun"""
+        if action is not None:
+            action(self.at)
+        start = time.perf_counter()
+        self.at.run()
+        self.samples.append((name, time.perf_counter() - start))
+        if self.at.exception:
+            self.errors.append((name, self.at.exception[0].message))
+
+
+class ClinicianSession(Session):
+    def iteration(self, index):
+        data = generate_assessment(self.rng, datetime(2025, 1, 1))
+        while validate_assessment(data):
+            # The wizard would not let invalid answers through
+            data = generate_assessment(self.rng, datetime(2025, 1, 1))
+        data["client_id"] = f"LOAD{index:08d}"
+        at = self.at
+        at.session_state["page"] = "home"
+        self.step("home")
+        self.step("open_wizard", lambda at: at.button(key="client").click())
+
+        def step1(at):
+            for label, field in (("First Name*", "first_name"), ("Last Name*", "last_name"), ("Client ID*", "client_id")):
+                _labeled(at.text_input, label).input(data[field])
+            _labeled(at.button, "Next →").click()
+        self.step("wizard_step1", step1)
+
+        def step2(at):
+            for label, field in (("Age*", "age"), ("Height*", "height"), ("Weight (lbs)*", "weight")):
+                _labeled(at.text_input, label).input(data[field])
+            _labeled(at.button, "Next →").click()
+        self.step("wizard_step2", step2)
+
+        def step3(at):
+            at.radio(key="dx").set_value(data["diagnoses"])
+            at.radio(key="meds").set_value(data["medications"])
+            _labeled(at.button, "Next →").click()
+        self.step("wizard_step3", step3)
+
+        def step4(at):
+            at.radio(key="seizures").set_value("No")
+            _labeled(at.text_area, "Additional Notes or Special Instructions:").input(data["additional_notes"])
+            _labeled(at.button, "📊 Submit Assessment").click()
+        self.step("wizard_submit", step4)
+
+
+class AdminSession(Session):
+    def iteration(self, index):
+        at = self.at
+        at.session_state["page"] = "admin"
+        self.step("admin")
+        self.step("admin_sort", lambda at: at.selectbox(key="sort_by").set_value(self.rng.choice(SORTS)))
+        self.step("admin_page", lambda at: at.number_input(key="page_number").set_value(self.rng.randint(1, 3)))
+        self.step("admin_search", lambda at: at.text_input(key="filter_search").input(self.rng.choice(SEARCH_TERMS)))
+        self.step("admin_clear_search", lambda at: at.text_input(key="filter_search").input(""))
+
+
+def _drive(session, duration, barrier, think, counter):
+    kind, rng = type(session), session.rng
+    # Every session starts its clock together
+    barrier.wait()
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        with counter["lock"]:
+            index = counter["next"]
+            counter["next"] += 1
+        try:
+            session.iteration(index)
+        except Exception as e:
+            session.errors.append((kind.__name__, repr(e)))
+            # Start over from a fresh session, as a reloading browser would
+            session = kind(rng, session.samples, session.errors)
+        if think:
+            time.sleep(rng.uniform(0, 2 * think))
+
+
+def summarize(samples):
+    """Latency percentiles per interaction, in seconds"""
+    by_name = {}
+    for name, seconds in samples:
+        by_name.setdefault(name, []).append(seconds)
+    rows = []
+    for name, times in by_name.items():
+        cuts = statistics.quantiles(times, n=100, method="inclusive") if len(times) > 1 else times * 99
+        rows.append({
+            "name": name, "count": len(times), "mean": statistics.fmean(times),
+            "p50": cuts[49], "p95": cuts[94], "p99": cuts[98], "max": max(times),
+        })
+    return rows
+
+
+def run(clinicians, admins, duration, seed, seed_rows, think):
+    if DEFAULT_DB_PATH != SCRATCH_DB_PATH:
+        raise RuntimeError(
+            f"The app would open {DEFAULT_DB_PATH}, not this run's scratch database: "
+            "storage was imported before benchmarks.load"
+        )
+    store = SQLiteAssessmentStore(SCRATCH_DB_PATH, scorer=assessment_risk)
+    store.clear()
+    if seed_rows:
+        store.add_many([with_risk(a) for a in generate_assessments(seed_rows, seed=seed)])
+    store.close()
+
+    samples, errors = [], []
+    counter = {"next": 0, "lock": threading.Lock()}
+    sessions = [
+        kind(random.Random(f"{seed}-{kind.__name__}-{i}"), samples, errors)
+        for kind, count in ((ClinicianSession, clinicians), (AdminSession, admins))
+        for i in range(count)
+    ]
+    barrier = threading.Barrier(len(sessions) + 1)
+    threads = [
+        threading.Thread(
+            target=_drive, args=(session, duration, barrier, think, counter),
+            name=f"load-{i}", daemon=True,
+        )
+        for i, session in enumerate(sessions)
+    ]
+    rss_start = rss_bytes()
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    rss_end = rss_bytes()
+
+    interactions = summarize(samples)
+    for row in interactions:
+        print(
+            f"{row['name']:<22} n={row['count']:<6} p50 {row['p50'] * 1000:9.1f} ms"
+            f"  p95 {row['p95'] * 1000:9.1f} ms  p99 {row['p99'] * 1000:9.1f} ms",
+            file=sys.stderr,
+        )
+    submissions = sum(1 for name, _ in samples if name == "wizard_submit")
+    print(
+        f"{len(samples) / elapsed:.1f} reruns/s, {submissions / elapsed:.2f} submissions/s, "
+        f"RSS +{(rss_end - rss_start) / 2**20:.1f} MiB, {len(errors)} error(s)",
+        file=sys.stderr,
+    )
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "clinicians": clinicians, "admins": admins, "duration": duration,
+            "seed": seed, "seed_rows": seed_rows, "think": think,
+        },
+        "elapsed": elapsed,
+        "throughput": {"reruns_per_second": len(samples) / elapsed, "submissions_per_second": submissions / elapsed},
+        "memory": {"rss_start": rss_start, "rss_end": rss_end, "rss_growth": rss_end - rss_start},
+        "errors": [{"where": where, "error": error} for where, error in errors[:100]],
+        "error_count": len(errors),
+        "interactions": interactions,
+    }
+
+
+def compare(base_path, new_path):
+    """Print p50/p95/p99 ratios between two result files (>1 means slower)"""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    if base["config"] != new["config"]:
+        print(f"warning: configs differ: {base['config']} vs {new['config']}", file=sys.stderr)
+    old_rows = {r["name"]: r for r in base["interactions"]}
+    print(f"{'interaction':<22} {'p50':>7} {'p95':>7} {'p99':>7}")
+    for r in new["interactions"]:
+        old = old_rows.get(r["name"])
+        if old is None:
+            continue
+        ratios = [r[p] / old[p] if old[p] else float("inf") for p in ("p50", "p95", "p99")]
+        print(f"{r['name']:<22} " + " ".join(f"{ratio:>7.2f}" for ratio in ratios))
+    print(
+        f"{'reruns/s':<22} {base['throughput']['reruns_per_second']:.1f} -> {new['throughput']['reruns_per_second']:.1f}"
+    )
+    print(
+        f"{'RSS growth MiB':<22} {base['memory']['rss_growth'] / 2**20:.1f} -> {new['memory']['rss_growth'] / 2**20:.1f}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Home Care Risk Assessment multi-session load test")
+    parser.add_argument("--clinicians", type=int, default=10, help="Concurrent wizard sessions")
+    parser.add_argument("--admins", type=int, default=2, help="Concurrent admin dashboard sessions")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--seed-rows", type=int, default=10000, help="Assessments stored before the run")
+    parser.add_argument("--think", type=float, default=0, help="Mean pause between iterations, in seconds")
+    parser.add_argument("-o", "--output", default="load_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Compare two result files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    report = run(args.clinicians, args.admins, args.duration, args.seed, args.seed_rows, args.think)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['interactions'])} interaction summaries to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
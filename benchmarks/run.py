@@ -0,0 +1,180 @@
+"""Reproducible benchmark suite.
+
+Usage:
+    python -m benchmarks.run --sizes 1000 10000 100000 -o bench/HEAD.json
+    python -m benchmarks.run --compare bench/base.json bench/HEAD.json
+
+Every benchmark runs on the same seeded synthetic assessments. Results,
+with the git revision and interpreter, are written as JSON so runs from
+different revisions can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# The app reads its database path at import time, so point it at a scratch
+# database before anything imports storage
+_DB_DIR = tempfile.mkdtemp(prefix="risk_bench_")
+SCRATCH_DB_PATH = os.path.join(_DB_DIR, "assessments.db")
+os.environ["RISK_APP_DB"] = SCRATCH_DB_PATH
+
+from archive import ColumnarArchive  # noqa: E402
+from benchmarks import APP_PATH, git_revision  # noqa: E402
+from benchmarks.synthetic import generate_assessments  # noqa: E402
+from export import export_assessments  # noqa: E402
+from pdf_report import generate_pdf_report, pdf_bundle  # noqa: E402
+from records import AssessmentRecord  # noqa: E402
+from report import generate_text_report  # noqa: E402
+from scoring import assessment_risk, calculate_risk_score, calculate_risk_scores_batch, with_risk  # noqa: E402
+from storage import DEFAULT_DB_PATH, SQLiteAssessmentStore  # noqa: E402
+
+def measure(fn, repeat):
+    """Run `fn` once to warm up, then `repeat` times, summarizing wall-clock seconds"""
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times), "mean": statistics.fmean(times)}
+
+
+def _drain(fmt, data, compress=False):
+    export_assessments(iter(data), fmt, scorer=assessment_risk, compress=compress).close()
+
+
+def _fresh_store(data):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteAssessmentStore(os.path.join(tmp, "bench.db"), scorer=assessment_risk)
+        store.add_many(data)
+        store.close()
+
+
+def _fresh_archive(data):
+    with tempfile.TemporaryDirectory() as tmp:
+        ColumnarArchive(tmp).append(data)
+
+
+def _archived(data):
+    """Path of an archive holding `data`, built on first use (during warm-up)"""
+    path = os.path.join(_DB_DIR, f"archive_{len(data)}")
+    if not os.path.exists(path):
+        ColumnarArchive(path).append(data)
+    return path
+
+
+def core_benchmarks(raw, stamped, records):
+    return {
+        "calculate_risk_score": lambda: [calculate_risk_score(a) for a in raw],
+        "calculate_risk_score_records": lambda: [calculate_risk_score(r) for r in records],
+        "calculate_risk_scores_batch": lambda: calculate_risk_scores_batch(raw),
+        "generate_text_report": lambda: [generate_text_report(a) for a in stamped],
+        "generate_pdf_report": lambda: [generate_pdf_report(a) for a in stamped],
+        "pdf_bundle": lambda: pdf_bundle(stamped).close(),
+        "export_csv": lambda: _drain("csv", stamped),
+        "export_ndjson": lambda: _drain("ndjson", stamped),
+        "export_json": lambda: _drain("json", stamped),
+        "export_json_gzip": lambda: _drain("json", stamped, compress=True),
+        "store_add_many": lambda: _fresh_store(stamped),
+        "archive_append": lambda: _fresh_archive(stamped),
+        "archive_open_aggregates": lambda: ColumnarArchive(_archived(stamped)).aggregates(),
+    }
+
+
+def scratch_store(path):
+    """Open and empty the store at `path`, refusing anything outside the temp directory"""
+    path, tmp = os.path.realpath(path), os.path.realpath(tempfile.gettempdir())
+    if os.path.commonpath([path, tmp]) != tmp:
+        raise RuntimeError(f"Refusing to clear {path}: not a scratch database (storage imported before benchmarks.run?)")
+    store = SQLiteAssessmentStore(path, scorer=assessment_risk)
+    store.clear()
+    return store
+
+
+def admin_rerun_benchmark(stamped, repeat):
+    """Time full admin() reruns through Streamlit's AppTest"""
+    from streamlit.testing.v1 import AppTest
+
+    store = scratch_store(DEFAULT_DB_PATH)
+    store.add_many(stamped)
+    store.close()
+
+    at = AppTest.from_file(APP_PATH, default_timeout=600)
+    at.session_state["page"] = "admin"
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"admin() raised: {at.exception[0].message}")
+    return measure(at.run, repeat)
+
+
+def run(sizes, repeat, seed, include_app=True, only=None):
+    results = []
+    for size in sizes:
+        raw = generate_assessments(size, seed=seed)
+        stamped = [with_risk(dict(a)) for a in raw]
+        records = [AssessmentRecord.from_dict(a) for a in raw]
+        benchmarks = core_benchmarks(raw, stamped, records)
+        for name, fn in benchmarks.items():
+            if only and name not in only:
+                continue
+            stats = measure(fn, repeat)
+            results.append({"name": name, "size": size, **stats})
+            print(f"{name:<32} n={size:<8} median {stats['median'] * 1000:10.2f} ms", file=sys.stderr)
+        if include_app and (not only or "admin_rerun" in only):
+            stats = admin_rerun_benchmark(stamped, repeat)
+            results.append({"name": "admin_rerun", "size": size, **stats})
+            print(f"{'admin_rerun':<32} n={size:<8} median {stats['median'] * 1000:10.2f} ms", file=sys.stderr)
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "seed": seed,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(base_path, new_path):
+    """Print median ratios between two result files (>1 means slower)"""
+    with open(base_path) as f:
+        base = {(r["name"], r["size"]): r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+    print(f"{'benchmark':<32} {'size':>8} {'base ms':>10} {'new ms':>10} {'ratio':>7}")
+    for r in new:
+        old = base.get((r["name"], r["size"]))
+        if old is None:
+            continue
+        ratio = r["median"] / old["median"] if old["median"] else float("inf")
+        print(f"{r['name']:<32} {r['size']:>8} {old['median'] * 1000:>10.2f} {r['median'] * 1000:>10.2f} {ratio:>7.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Home Care Risk Assessment benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", help="Run only these benchmarks")
+    parser.add_argument("--skip-app", action="store_true", help="Skip the AppTest admin rerun benchmark")
+    parser.add_argument("-o", "--output", default="benchmark_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Compare two result files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    report = run(args.sizes, args.repeat, args.seed, include_app=not args.skip_app, only=args.only)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['results'])} results to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Seeded generator of realistic synthetic assessments.
+
+Answers are spread so that every branch of the scoring rules is hit: all
+age and weight bands (including unparseable values), every seizure
+frequency/severity choice, serious and other diagnoses, and every Yes/No
+combination. Client IDs repeat, as they do for re-assessed clients.
+"""
+import random
+from datetime import datetime, timedelta
+
+from validation import FREQUENCY_OPTIONS, SEVERITY_OPTIONS, blank_assessment
+
+FIRST_NAMES = ["Mary", "John", "Patricia", "Robert", "Linda", "Michael", "Barbara", "William", "Elizabeth", "José"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "O'Neil", "Lee, Jr."]
+HEIGHTS = ["4'11\"", "5'2\"", "5'5\"", "5'7\"", "5'10\"", "6'1\""]
+SERIOUS_DIAGNOSES = ["Congestive heart failure", "Type 2 Diabetes", "History of stroke", "Cardiac arrhythmia", "Breast cancer"]
+OTHER_DIAGNOSES = ["Hypertension", "Osteoarthritis", "COPD", "Mild dementia", "Glaucoma"]
+MEDICATIONS = ["Metformin 500mg", "Lisinopril 10mg", "Warfarin 5mg", "Levetiracetam 500mg", "Atorvastatin 20mg"]
+SEIZURE_DETAILS = ["Triggered by missed doses", "Lasts 1-2 minutes", "Post-ictal confusion for an hour", ""]
+NOTES = ["Lives alone", "Daughter visits daily", "Uses a walker", "Prefers morning visits", ""]
+
+
+def _age(rng):
+    if rng.random() < 0.02:
+        return rng.choice(["", "unknown", "74.5"])
+    return str(rng.choice([rng.randint(18, 65), rng.randint(66, 75), rng.randint(76, 85), rng.randint(86, 102)]))
+
+
+def _weight(rng):
+    if rng.random() < 0.02:
+        return rng.choice(["", "n/a"])
+    return str(rng.choice([rng.randint(80, 99), rng.randint(100, 250), rng.randint(251, 380)]))
+
+
+def generate_assessment(rng, start, days=365, clients=None):
+    """One synthetic assessment dict using `rng`"""
+    data = blank_assessment()
+    data["first_name"] = rng.choice(FIRST_NAMES)
+    data["last_name"] = rng.choice(LAST_NAMES)
+    data["client_id"] = f"CL{rng.randrange(clients or 10**6):06d}"
+    data["age"] = _age(rng)
+    data["height"] = rng.choice(HEIGHTS)
+    data["weight"] = _weight(rng)
+
+    if rng.random() < 0.6:
+        data["diagnoses"] = "Yes"
+        pool = SERIOUS_DIAGNOSES if rng.random() < 0.5 else OTHER_DIAGNOSES
+        data["diagnoses_details"] = ", ".join(rng.sample(pool, rng.randint(1, 3)))
+    if rng.random() < 0.3:
+        data["seizures"] = "Yes"
+        data["seizure_frequency"] = rng.choice(FREQUENCY_OPTIONS[1:])
+        data["seizure_severity"] = rng.choice(SEVERITY_OPTIONS[1:])
+        data["seizure_type"] = rng.choice(SEIZURE_DETAILS)
+    if rng.random() < 0.7:
+        data["medications"] = "Yes"
+        data["medication_details"] = ", ".join(rng.sample(MEDICATIONS, rng.randint(1, 4)))
+    data["assist_medical"] = rng.choice(["Yes", "No"])
+    data["additional_notes"] = rng.choice(NOTES)
+    when = start + timedelta(seconds=rng.randrange(days * 86400))
+    data["timestamp"] = when.strftime("%Y-%m-%d %H:%M:%S")
+    return data
+
+
+def generate_assessments(count, seed=0, start=datetime(2025, 1, 1), days=365, clients=None):
+    """`count` reproducible assessments spread over `days` days from `start`.
+
+    `clients` bounds the number of distinct client IDs (default: about a
+    third of `count`, so most clients are assessed more than once).
+    """
+    rng = random.Random(seed)
+    clients = clients or max(1, count // 3)
+    return [generate_assessment(rng, start, days, clients) for _ in range(count)]
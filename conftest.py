@@ -0,0 +1 @@
+"""Lets tests import the top-level app modules when run with plain `pytest`."""
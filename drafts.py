@@ -0,0 +1,100 @@
+"""Write-behind autosave of in-progress wizard drafts.
+
+save() only records the draft in memory and wakes a background thread,
+so a step transition never waits on the database. The thread waits
+`delay` seconds for more saves, keeps only the newest draft per client,
+and writes the batch in one transaction. Drafts older than `ttl` are
+expired as the thread runs and are never resumed.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+DRAFT_FLUSH_DELAY = 0.5
+DRAFT_TTL = timedelta(days=7)
+DRAFT_EXPIRE_INTERVAL = timedelta(hours=1)
+
+
+class DraftWriter:
+    """Coalescing, batched write-behind queue of drafts keyed by client_id"""
+
+    def __init__(self, store, delay=DRAFT_FLUSH_DELAY, ttl=DRAFT_TTL):
+        self.store = store
+        self.delay = delay
+        self.ttl = ttl
+        self.error = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._expired_at = None
+
+    def save(self, client_id, step, data):
+        """Queue the draft of `client_id` at wizard `step`"""
+        self._queue(client_id, (step, dict(data), datetime.now()))
+
+    def discard(self, client_id):
+        """Queue deletion of the draft of `client_id`, e.g. once submitted"""
+        self._queue(client_id, None)
+
+    def _queue(self, client_id, draft):
+        with self._lock:
+            self._pending[client_id] = draft
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="risk-app-drafts", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def load(self, client_id):
+        """The newest unexpired draft of `client_id` (step, data, saved_at), or None"""
+        with self._lock:
+            if client_id in self._pending:
+                draft = self._pending[client_id]
+                if draft is None or self._expired(draft[2]):
+                    return None
+                return draft[0], dict(draft[1]), draft[2]
+        saved = self.store.draft(client_id)
+        if saved is None or self._expired(saved["saved_at"]):
+            return None
+        return saved["step"], saved["data"], saved["saved_at"]
+
+    def _expired(self, saved_at):
+        return saved_at < datetime.now() - self.ttl
+
+    def flush(self):
+        """Write every queued draft now; returns how many were written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            try:
+                self.store.save_drafts(batch)
+            except Exception:
+                # Requeue what failed unless a newer save replaced it meanwhile
+                with self._lock:
+                    for client_id, draft in batch.items():
+                        self._pending.setdefault(client_id, draft)
+                raise
+            return len(batch)
+
+    def expire(self):
+        """Delete drafts older than the TTL"""
+        self._expired_at = datetime.now()
+        return self.store.expire_drafts(self._expired_at - self.ttl)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            # Let rapid saves pile up so they are written together
+            self._wake.clear()
+            time.sleep(self.delay)
+            try:
+                self.flush()
+                if self._expired_at is None or datetime.now() - self._expired_at >= DRAFT_EXPIRE_INTERVAL:
+                    self.expire()
+                self.error = None
+            except Exception as e:
+                self.error = e
+                self._wake.set()
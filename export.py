@@ -0,0 +1,98 @@
+import csv
+import gzip
+import io
+import json
+import tempfile
+
+from instrumentation import timed
+
+SUMMARY_HEADER = ["Client ID", "Name", "Age", "Risk Level", "Risk Score", "Timestamp"]
+
+# Keep exports in memory up to this size, then spill to a temporary file
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+EXPORT_FORMATS = {
+    "json": ("json", "application/json"),
+    "ndjson": ("ndjson", "application/x-ndjson"),
+    "csv": ("csv", "text/csv"),
+}
+
+
+# Row Generators
+def summary_rows(records, scorer):
+    """Yield one CSV summary row per assessment"""
+    for a in records:
+        score, level = scorer(a)[:2]
+        yield [
+            a["client_id"],
+            f"{a['first_name']} {a['last_name']}",
+            a["age"],
+            level,
+            f"{score:.0f}",
+            a.get("timestamp", "N/A"),
+        ]
+
+
+# Writers
+def write_csv(records, out, scorer):
+    """Write the CSV summary of `records` to the text stream `out`"""
+    writer = csv.writer(out)
+    writer.writerow(SUMMARY_HEADER)
+    for row in summary_rows(records, scorer):
+        writer.writerow(row)
+
+
+def write_ndjson(records, out):
+    """Write one JSON object per line to the text stream `out`"""
+    for a in records:
+        out.write(json.dumps(a))
+        out.write("\n")
+
+
+def write_json(records, out):
+    """Write `records` as an indented JSON array without building it in memory"""
+    out.write("[")
+    empty = True
+    for a in records:
+        out.write("\n  " if empty else ",\n  ")
+        out.write(json.dumps(a, indent=2).replace("\n", "\n  "))
+        empty = False
+    out.write("]" if empty else "\n]")
+
+
+@timed("export")
+def export_assessments(records, fmt, scorer=None, compress=False):
+    """Stream `records` into a rewound binary file object in format `fmt`.
+
+    Output is gzip-compressed when `compress` is set. Memory stays bounded
+    because rows are written as they are read and large outputs spill to
+    a temporary file.
+    """
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    raw = gzip.GzipFile(fileobj=buffer, mode="wb") if compress else buffer
+    out = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    if fmt == "csv":
+        write_csv(records, out, scorer)
+    elif fmt == "ndjson":
+        write_ndjson(records, out)
+    elif fmt == "json":
+        write_json(records, out)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    out.flush()
+    out.detach()
+    if compress:
+        raw.close()
+    buffer.seek(0)
+    return buffer
+
+
+def export_file_name(prefix, fmt, compress=False, date=None):
+    """File name such as All_Assessments_20240101.ndjson.gz"""
+    suffix = f"_{date}" if date else ""
+    extension = EXPORT_FORMATS[fmt][0] + (".gz" if compress else "")
+    return f"{prefix}{suffix}.{extension}"
+
+
+def export_mime(fmt, compress=False):
+    return "application/gzip" if compress else EXPORT_FORMATS[fmt][1]
@@ -0,0 +1,197 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from scoring import calculate_risk_scores_batch, with_risk
+from validation import ASSESSMENT_FIELDS, blank_assessment, validate_assessment
+
+IMPORT_CHUNK_SIZE = 500
+IMPORT_FORMATS = ("csv", "json", "ndjson")
+
+
+# Reading
+def detect_format(name):
+    """Import format from a file name extension"""
+    extension = os.path.splitext(name.lower())[1].lstrip(".")
+    if extension == "jsonl":
+        return "ndjson"
+    if extension not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import file type: {name}")
+    return extension
+
+
+class InvalidRow:
+    """Stands in for an input row that could not be parsed, so it is
+    reported as a row error instead of aborting the whole import"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _parse_ndjson(text):
+    for line in text.splitlines():
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield InvalidRow(f"Invalid JSON: {e}")
+
+
+def read_rows(source, fmt=None):
+    """Read raw assessment rows from a path or an uploaded file object.
+
+    Every value is converted to a string and missing fields get the
+    wizard's defaults, so imported rows look like wizard submissions.
+    Unparseable NDJSON lines and JSON values that are not objects are
+    yielded as InvalidRow.
+    """
+    name = source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "")
+    fmt = fmt or detect_format(str(name))
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            raw = f.read()
+    else:
+        raw = source.read()
+    text = raw.decode("utf-8-sig") if isinstance(raw, bytes) else raw
+
+    if fmt == "csv":
+        rows = csv.DictReader(io.StringIO(text))
+    elif fmt == "ndjson":
+        rows = _parse_ndjson(text)
+    else:
+        rows = json.loads(text)
+        if isinstance(rows, dict):
+            rows = [rows]
+        elif not isinstance(rows, list):
+            raise ValueError("Expected a JSON array of assessments")
+
+    for row in rows:
+        if isinstance(row, InvalidRow):
+            yield row
+        elif not isinstance(row, dict):
+            yield InvalidRow("Expected a JSON object")
+        else:
+            yield normalize_row(row)
+
+
+def normalize_row(row):
+    """Wizard-shaped assessment from a raw mapping: string values, defaults filled in"""
+    record = blank_assessment()
+    for field in ASSESSMENT_FIELDS:
+        value = row.get(field)
+        if value is not None:
+            record[field] = str(value).strip()
+    return record
+
+
+# Validation & Scoring
+def process_chunk(start, rows):
+    """Validate and score one chunk of rows (runs in a worker process).
+
+    Returns (accepted records, [(row number, client_id, error), ...]) with
+    row numbers counted from 1.
+    """
+    valid, errors = [], []
+    for offset, row in enumerate(rows):
+        if isinstance(row, InvalidRow):
+            errors.append((start + offset + 1, "", row.error))
+            continue
+        problems = validate_assessment(row)
+        if problems:
+            errors.append((start + offset + 1, row.get("client_id", ""), "; ".join(problems)))
+        else:
+            valid.append(row)
+    for row, result in zip(valid, calculate_risk_scores_batch(valid)):
+        with_risk(row, result)
+    return valid, errors
+
+
+def reject_duplicates(numbered, store):
+    """Split [(row number, record)] into rows the store will accept and errors.
+
+    Only the "reject" duplicate policy refuses rows: those whose client_id
+    is already stored, or appears earlier in the same file, become errors.
+    """
+    if getattr(store, "duplicates", "append") != "reject":
+        return numbered, []
+    seen = set(store.known_clients({record["client_id"] for _, record in numbered}))
+    kept, errors = [], []
+    for number, record in numbered:
+        client_id = record["client_id"]
+        if client_id in seen:
+            errors.append((number, client_id, "Client ID already assessed"))
+        else:
+            seen.add(client_id)
+            kept.append((number, record))
+    return kept, errors
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ImportResult:
+    """Outcome of a bulk import"""
+
+    def __init__(self):
+        self.imported = 0
+        self.errors = []
+
+    @property
+    def rejected(self):
+        return len(self.errors)
+
+
+def import_assessments(source, store, fmt=None, progress=None, workers=None, chunk_size=IMPORT_CHUNK_SIZE):
+    """Validate, score and store every row of `source` in one batched write.
+
+    Chunks are processed in a process pool when there is more than one.
+    `progress(done, total)` is called as chunks finish. Under the store's
+    "reject" duplicate policy, rows for known client_ids become errors.
+    """
+    chunks = list(_chunks(read_rows(source, fmt), chunk_size))
+    total = sum(len(c) for c in chunks)
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    result = ImportResult()
+    accepted = []
+
+    def collect(start, count, valid, errors):
+        rejected = {row for row, _, _ in errors}
+        numbers = [n for n in range(start + 1, start + count + 1) if n not in rejected]
+        accepted.extend(zip(numbers, valid))
+        result.errors.extend(errors)
+        if progress:
+            progress(len(accepted) + len(result.errors), total)
+
+    starts = [i * chunk_size for i in range(len(chunks))]
+    if len(chunks) > 1:
+        # spawn keeps workers independent of the server's threads
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            for start, chunk, outcome in zip(starts, chunks, pool.map(process_chunk, starts, chunks)):
+                collect(start, len(chunk), *outcome)
+    else:
+        for start, chunk in zip(starts, chunks):
+            collect(start, len(chunk), *process_chunk(start, chunk))
+
+    accepted, duplicates = reject_duplicates(accepted, store)
+    result.errors.extend(duplicates)
+    for _, record in accepted:
+        if not record["timestamp"]:
+            record["timestamp"] = timestamp
+    if accepted:
+        store.add_many([record for _, record in accepted])
+    result.imported = len(accepted)
+    result.errors.sort()
+    return result
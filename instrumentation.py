@@ -0,0 +1,158 @@
+"""Opt-in timing spans for the app's hot paths.
+
+Set RISK_APP_PROFILE=1 to record spans. When it is unset, `timed` hands
+back the undecorated function and `span` is a shared no-op context, so
+instrumentation costs nothing in production.
+
+Finished spans go into a fixed-size ring buffer for the diagnostics panel
+and into cumulative histograms exported in Prometheus text format. Set
+RISK_APP_METRICS_PORT to also serve them over HTTP at /metrics, on
+127.0.0.1 unless RISK_APP_METRICS_HOST says otherwise.
+"""
+import errno
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+ENABLED = os.environ.get("RISK_APP_PROFILE", "") not in ("", "0")
+METRICS_HOST = os.environ.get("RISK_APP_METRICS_HOST", "127.0.0.1")
+RING_BUFFER_SIZE = 4096
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_recent = deque(maxlen=RING_BUFFER_SIZE)
+_totals = {}
+_lock = threading.Lock()
+_NO_SPAN = nullcontext()
+
+
+# Recording
+def record(name, seconds):
+    """Record one finished span"""
+    _recent.append((time.time(), name, seconds))
+    with _lock:
+        total = _totals.get(name)
+        if total is None:
+            total = _totals[name] = {"count": 0, "sum": 0.0, "buckets": [0] * len(BUCKETS)}
+        total["count"] += 1
+        total["sum"] += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                total["buckets"][i] += 1
+
+
+@contextmanager
+def _span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def span(name):
+    """Context manager timing a block as `name` (no-op when disabled)"""
+    return _span(name) if ENABLED else _NO_SPAN
+
+
+def timed(name):
+    """Decorator timing every call as `name` (returns `fn` unchanged when disabled)"""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# Reporting
+def recent_spans():
+    """Snapshot of the ring buffer as (unix time, name, seconds) tuples"""
+    return list(_recent)
+
+
+def summary():
+    """Per-span count, p50, p95 and max (ms) over the ring buffer"""
+    import statistics
+
+    by_name = {}
+    for _, name, seconds in recent_spans():
+        by_name.setdefault(name, []).append(seconds * 1000)
+    rows = []
+    for name, values in sorted(by_name.items()):
+        values.sort()
+        rows.append({
+            "span": name,
+            "count": len(values),
+            "p50_ms": round(statistics.median(values), 3),
+            "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+            "max_ms": round(values[-1], 3),
+        })
+    return rows
+
+
+def prometheus_text():
+    """Cumulative span histograms in Prometheus text exposition format"""
+    lines = [
+        "# HELP risk_app_span_seconds Time spent in instrumented app code paths",
+        "# TYPE risk_app_span_seconds histogram",
+    ]
+    with _lock:
+        totals = {name: dict(t, buckets=list(t["buckets"])) for name, t in _totals.items()}
+    for name, total in sorted(totals.items()):
+        for bound, count in zip(BUCKETS, total["buckets"]):
+            lines.append(f'risk_app_span_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+        lines.append(f'risk_app_span_seconds_bucket{{span="{name}",le="+Inf"}} {total["count"]}')
+        lines.append(f'risk_app_span_seconds_sum{{span="{name}"}} {total["sum"]:.6f}')
+        lines.append(f'risk_app_span_seconds_count{{span="{name}"}} {total["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    _recent.clear()
+    with _lock:
+        _totals.clear()
+
+
+def start_metrics_server(port=None, host=METRICS_HOST):
+    """Serve /metrics on `port` (or $RISK_APP_METRICS_PORT) in a daemon thread.
+
+    Returns None when no port is set or another process already holds it.
+    """
+    port = port or int(os.environ.get("RISK_APP_METRICS_PORT", 0))
+    if not port:
+        return None
+    # Imported here so importing this module stays cheap when nothing is served
+    import logging
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        if e.errno != errno.EADDRINUSE:
+            raise
+        logging.getLogger("risk_app.instrumentation").warning("Metrics port %s:%s is already in use; /metrics is not served", host, port)
+        return None
+    threading.Thread(target=server.serve_forever, name="risk-app-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,350 @@
+"""PDF risk assessment reports.
+
+Reports are laid out from REPORT_TEMPLATE and written as PDF 1.4 with the
+standard Helvetica fonts, so no PDF library is needed. The template and
+the PDF objects shared by every report are parsed and serialized once per
+process.
+
+Template directives (one per line; a trailing `?` skips the line when its
+value is empty):
+    title    TEXT
+    heading  TEXT
+    field    LABEL | TEXT         label and wrapped value on one row
+    para     LABEL | TEXT         label, then wrapped text below it
+    bullets  NAME                one bullet per item of list NAME
+    bullet   TEXT
+    space
+TEXT may use {field} placeholders from report_context().
+"""
+import multiprocessing
+import os
+import re
+import tempfile
+import textwrap
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import chain, islice
+
+from export import SPOOL_MAX_BYTES
+from instrumentation import timed
+from scoring import assessment_risk
+from validation import ASSESSMENT_FIELDS
+
+REPORT_TEMPLATE = """
+title     HOME CARE RISK ASSESSMENT REPORT
+
+heading   CLIENT INFORMATION
+field     Name | {first_name} {last_name}
+field     Client ID | {client_id}
+field     Age | {age} years
+field     Height | {height}
+field     Weight | {weight} lbs
+field     Assessment Date | {timestamp}
+
+heading   RISK ASSESSMENT SCORE
+field     Risk Score | {risk_score} points
+field     Risk Level | {risk_level}
+
+heading   IDENTIFIED RISK FACTORS
+bullets   risk_factors
+
+heading   MEDICAL INFORMATION
+field     Medical Diagnoses | {diagnoses}
+field?    Details | {diagnoses_details}
+space
+field     Seizure History | {seizures}
+field?    Frequency | {seizure_frequency}
+field?    Severity | {seizure_severity}
+field?    Additional Details | {seizure_type}
+space
+field     Current Medications | {medications}
+field?    Details | {medication_details}
+space
+field     Requires Medical Assistance | {assist_medical}
+para?     Additional Notes | {additional_notes}
+
+heading   RISK LEVEL GUIDELINES
+bullet    Low (0-34): Standard care protocols apply
+bullet    Moderate (35-59): Enhanced monitoring recommended
+bullet    High (60-79): Specialized care required
+bullet    Critical (80+): Immediate intervention protocols
+"""
+
+FOOTER = "Report generated by Home Care Risk Assessment System  -  Confidential - HIPAA Protected Information"
+DIRECTIVES = ("title", "heading", "field", "para", "bullets", "bullet", "space")
+
+# US Letter, in points
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+MARGIN = 54
+LABEL_WIDTH = 170
+BODY_SIZE = 10
+LEADING = 14
+# Average Helvetica glyph width as a fraction of the font size, for wrapping
+CHAR_WIDTH = 0.55
+
+# Reports per task sent to a worker process, and tasks queued per worker
+REPORT_CHUNK_SIZE = 64
+CHUNKS_PER_WORKER = 2
+
+
+# Template
+@lru_cache(maxsize=None)
+def parse_template(text=REPORT_TEMPLATE):
+    """Parse template text into (directive, label, value, optional) tuples"""
+    ops = []
+    for number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        directive, _, rest = line.partition(" ")
+        optional = directive.endswith("?")
+        directive = directive.rstrip("?")
+        if directive not in DIRECTIVES:
+            raise ValueError(f"Report template line {number}: unknown directive {directive!r}")
+        label, sep, value = rest.partition("|")
+        if not sep:
+            label, value = "", label
+        ops.append((directive, label.strip(), value.strip(), optional))
+    return tuple(ops)
+
+
+def report_context(assessment):
+    """Template values for one assessment (dict or AssessmentRecord)"""
+    score, level, risk_factors = assessment_risk(assessment)
+    context = {field: assessment.get(field) or "" for field in ASSESSMENT_FIELDS}
+    context["timestamp"] = assessment.get("timestamp") or "N/A"
+    context["risk_score"] = f"{score:.0f}"
+    context["risk_level"] = level.upper()
+    context["risk_factors"] = list(risk_factors) or ["No significant risk factors identified"]
+    # Details only apply when the matching question was answered Yes
+    if context["diagnoses"] != "Yes":
+        context["diagnoses_details"] = ""
+    if context["seizures"] != "Yes":
+        context["seizure_frequency"] = context["seizure_severity"] = context["seizure_type"] = ""
+    if context["medications"] != "Yes":
+        context["medication_details"] = ""
+    return context
+
+
+# Layout
+def _wrap(text, width, size=BODY_SIZE):
+    return textwrap.wrap(text, max(1, int(width / (size * CHAR_WIDTH)))) or [""]
+
+
+class _Layout:
+    """Places text top to bottom, starting new pages as needed"""
+
+    def __init__(self):
+        self.pages = []
+        self._new_page()
+
+    def _new_page(self):
+        self.ops = []
+        self.pages.append(self.ops)
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def _reserve(self, height):
+        if self.y - height < MARGIN + LEADING:
+            self._new_page()
+
+    def text(self, x, value, font="F1", size=BODY_SIZE):
+        self.ops.append(("text", font, size, x, self.y, value))
+
+    def rule(self, width=0.75):
+        self.ops.append(("rule", width, self.y))
+
+    def line(self, height=LEADING):
+        self.y -= height
+
+    def title(self, value):
+        self.text(MARGIN, value, "F2", 16)
+        self.line(10)
+        self.rule(1.5)
+        self.line(LEADING)
+
+    def heading(self, value):
+        self._reserve(3 * LEADING)
+        self.line(8)
+        self.text(MARGIN, value, "F2", 11)
+        self.line(5)
+        self.rule()
+        self.line(LEADING)
+
+    def field(self, label, value):
+        lines = _wrap(value, PAGE_WIDTH - 2 * MARGIN - LABEL_WIDTH)
+        self._reserve(LEADING * len(lines))
+        self.text(MARGIN, f"{label}:", "F2")
+        for line in lines:
+            self.text(MARGIN + LABEL_WIDTH, line)
+            self.line()
+
+    def para(self, label, value):
+        self._reserve(2 * LEADING)
+        self.text(MARGIN, f"{label}:", "F2")
+        self.line()
+        for line in _wrap(value, PAGE_WIDTH - 2 * MARGIN):
+            self._reserve(LEADING)
+            self.text(MARGIN, line)
+            self.line()
+
+    def bullet(self, value):
+        for i, line in enumerate(_wrap(value, PAGE_WIDTH - 2 * MARGIN - 14)):
+            self._reserve(LEADING)
+            if i == 0:
+                self.text(MARGIN + 4, "•")
+            self.text(MARGIN + 14, line)
+            self.line()
+
+
+def layout_report(assessment, template=REPORT_TEMPLATE):
+    """Lay out one report, returning a list of pages of drawing operations"""
+    context = report_context(assessment)
+    layout = _Layout()
+    for directive, label, value, optional in parse_template(template):
+        if directive == "bullets":
+            for item in context[value]:
+                layout.bullet(item)
+            continue
+        text = value.format_map(context)
+        if optional and not text.strip(" .,:|-"):
+            continue
+        if directive == "space":
+            layout.line(LEADING // 2)
+        elif directive in ("field", "para"):
+            getattr(layout, directive)(label, text)
+        else:
+            getattr(layout, directive)(text)
+    return layout.pages
+
+
+# PDF Writer
+def _pdf_string(text):
+    raw = text.encode("cp1252", errors="replace")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _content_stream(ops, page_number, page_count):
+    parts = []
+    for op in ops:
+        if op[0] == "text":
+            _, font, size, x, y, value = op
+            parts.append(b"BT /%s %d Tf %d %d Td %s Tj ET" % (font.encode(), size, x, y, _pdf_string(value)))
+        else:
+            _, width, y = op
+            parts.append(b"%.2f w %d %d m %d %d l S" % (width, MARGIN, y, PAGE_WIDTH - MARGIN, y))
+    footer_y = MARGIN - 20
+    parts.append(b"BT /F1 8 Tf %d %d Td %s Tj ET" % (MARGIN, footer_y, _pdf_string(FOOTER)))
+    parts.append(b"BT /F1 8 Tf %d %d Td %s Tj ET" % (
+        PAGE_WIDTH - MARGIN - 50, footer_y, _pdf_string(f"Page {page_number} of {page_count}"),
+    ))
+    return b"\n".join(parts)
+
+
+@lru_cache(maxsize=None)
+def _shared_objects():
+    """Font objects shared by every report, serialized once"""
+    font = b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>"
+    return font % b"Helvetica", font % b"Helvetica-Bold"
+
+
+def write_pdf(pages, title=""):
+    """Serialize laid-out pages to PDF bytes"""
+    regular, bold = _shared_objects()
+    # 1 catalog, 2 page tree, 3-4 fonts, 5 info, then a page and its content per page
+    page_ids = [6 + 2 * i for i in range(len(pages))]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % i for i in page_ids), len(pages)),
+        regular,
+        bold,
+        b"<< /Title %s /Producer (Home Care Risk Assessment System) >>" % _pdf_string(title),
+    ]
+    for number, (page_id, ops) in enumerate(zip(page_ids, pages), start=1):
+        content = _content_stream(ops, number, len(pages))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, page_id + 1)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R /Info 5 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+@timed("generate_pdf_report")
+def generate_pdf_report(assessment):
+    """Render one assessment as PDF bytes"""
+    title = f"Risk Assessment - {assessment.get('client_id') or ''}"
+    return write_pdf(layout_report(assessment), title)
+
+
+# Batch Generation
+def report_file_name(assessment, extension="pdf"):
+    """File name such as Risk_Assessment_CL000123_Smith_20250101.pdf"""
+    date = (assessment.get("timestamp") or "")[:10].replace("-", "")
+    parts = ["Risk_Assessment", assessment.get("client_id") or "", assessment.get("last_name") or "", date]
+    name = "_".join(re.sub(r"[^\w.-]+", "-", p).strip("-") for p in parts if p)
+    return f"{name}.{extension}"
+
+
+def render_chunk(assessments):
+    """Render a list of assessments to (file name, PDF bytes) pairs"""
+    return [(report_file_name(a), generate_pdf_report(a)) for a in assessments]
+
+
+def _chunks(assessments, size):
+    it = iter(assessments)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def _rendered(assessments, workers, chunk_size):
+    chunks = _chunks(assessments, chunk_size)
+    first = next(chunks, [])
+    second = next(chunks, None)
+    if second is None:
+        yield from render_chunk(first)
+        return
+    workers = workers or os.cpu_count() or 1
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        # Submit chunks only a little ahead of the ZIP writer, so rows are
+        # read from the store as reports are written rather than all up front
+        pending = deque()
+        for chunk in chain((first, second), chunks):
+            pending.append(pool.submit(render_chunk, chunk))
+            if len(pending) > workers * CHUNKS_PER_WORKER:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+@timed("pdf_bundle")
+def pdf_bundle(assessments, workers=None, chunk_size=REPORT_CHUNK_SIZE):
+    """Render every assessment to PDF and stream them into a rewound ZIP file object.
+
+    More than one chunk of reports is rendered across a process pool.
+    Duplicate file names get a numeric suffix.
+    """
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    seen = {}
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as bundle:
+        for name, pdf in _rendered(assessments, workers, chunk_size):
+            count = seen[name] = seen.get(name, 0) + 1
+            if count > 1:
+                stem, _, extension = name.rpartition(".")
+                name = f"{stem}_{count}.{extension}"
+            bundle.writestr(name, pdf)
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,122 @@
+"""Compact, typed assessment records.
+
+An AssessmentRecord keeps the same data as the assessment dict, but ages
+and weights are stored already parsed and Yes/No answers, seizure choices
+and risk levels are stored as small int codes. Conversion to and from the
+dict/JSON layout is lossless.
+
+Records are for code that holds or scores many assessments at once, like
+the columnar archive. The SQLite store keeps returning plain dicts.
+"""
+from validation import ASSESSMENT_FIELDS, FREQUENCY_OPTIONS, SEVERITY_OPTIONS
+
+YES_NO = ("No", "Yes")
+YES = YES_NO.index("Yes")
+FREQUENCY_CHOICES = ("",) + tuple(FREQUENCY_OPTIONS)
+SEVERITY_CHOICES = ("",) + tuple(SEVERITY_OPTIONS)
+RISK_LEVEL_CHOICES = ("Low", "Moderate", "High", "Critical")
+
+# Categorical fields stored as an index into their choices
+CODED_FIELDS = {
+    "diagnoses": YES_NO,
+    "seizures": YES_NO,
+    "medications": YES_NO,
+    "assist_medical": YES_NO,
+    "seizure_frequency": FREQUENCY_CHOICES,
+    "seizure_severity": SEVERITY_CHOICES,
+}
+_CODE_LOOKUP = {field: {v: i for i, v in enumerate(choices)} for field, choices in CODED_FIELDS.items()}
+_LEVEL_CODES = {v: i for i, v in enumerate(RISK_LEVEL_CHOICES)}
+
+TEXT_FIELDS = tuple(f for f in ASSESSMENT_FIELDS if f not in CODED_FIELDS and f not in ("age", "weight"))
+RISK_FIELDS = ("risk_score", "risk_level", "risk_factors", "risk_hash", "rule_version")
+_KNOWN_FIELDS = frozenset(ASSESSMENT_FIELDS) | frozenset(RISK_FIELDS) | {"id"}
+
+
+def _encode(lookup, value):
+    # Values outside the known choices are kept as-is so nothing is lost
+    return lookup.get(value, value)
+
+
+def _decode(choices, value):
+    return choices[value] if type(value) is int else value
+
+
+def _parse_number(raw, parse):
+    """Parse a numeric field, returning (number or None, raw text if needed).
+
+    The raw text is only kept when it cannot be rebuilt from the number.
+    """
+    try:
+        value = parse(raw)
+    except (ValueError, TypeError, OverflowError):
+        return None, raw
+    return value, (None if str(value) == raw else raw)
+
+
+def _parse_weight(raw):
+    try:
+        return int(raw)
+    except (ValueError, TypeError):
+        return float(raw)
+
+
+class AssessmentRecord:
+    __slots__ = (
+        TEXT_FIELDS + tuple(CODED_FIELDS)
+        + ("age", "age_text", "weight", "weight_text", "id")
+        + ("risk_score", "risk_level", "risk_factors", "risk_hash", "rule_version", "extra")
+    )
+
+    @classmethod
+    def from_dict(cls, data):
+        record = cls()
+        for field in TEXT_FIELDS:
+            setattr(record, field, data.get(field, ""))
+        for field, lookup in _CODE_LOOKUP.items():
+            setattr(record, field, _encode(lookup, data.get(field, "")))
+        record.age, record.age_text = _parse_number(data.get("age", ""), int)
+        record.weight, record.weight_text = _parse_number(data.get("weight", ""), _parse_weight)
+        record.id = data.get("id")
+        record.risk_score = data.get("risk_score")
+        record.risk_level = _encode(_LEVEL_CODES, data.get("risk_level"))
+        factors = data.get("risk_factors")
+        record.risk_factors = tuple(factors) if factors is not None else None
+        record.risk_hash = data.get("risk_hash")
+        record.rule_version = data.get("rule_version")
+        record.extra = {k: v for k, v in data.items() if k not in _KNOWN_FIELDS} or None
+        return record
+
+    def to_dict(self):
+        data = {}
+        for field in ASSESSMENT_FIELDS:
+            if field == "age":
+                data[field] = self.age_text if self.age_text is not None else str(self.age)
+            elif field == "weight":
+                data[field] = self.weight_text if self.weight_text is not None else str(self.weight)
+            elif field in CODED_FIELDS:
+                data[field] = _decode(CODED_FIELDS[field], getattr(self, field))
+            else:
+                data[field] = getattr(self, field)
+        if self.risk_score is not None:
+            data["risk_score"] = self.risk_score
+            data["risk_level"] = _decode(RISK_LEVEL_CHOICES, self.risk_level)
+            data["risk_factors"] = list(self.risk_factors)
+            data["risk_hash"] = self.risk_hash
+            if self.rule_version is not None:
+                data["rule_version"] = self.rule_version
+        if self.id is not None:
+            data["id"] = self.id
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def get(self, field, default=None):
+        """Dict-style read of a field in its original string form"""
+        if field in CODED_FIELDS:
+            return _decode(CODED_FIELDS[field], getattr(self, field))
+        if field in ("age", "weight"):
+            text = getattr(self, f"{field}_text")
+            return text if text is not None else str(getattr(self, field))
+        value = getattr(self, field, default)
+        return default if value is None else value
@@ -0,0 +1,89 @@
+from instrumentation import timed
+from scoring import assessment_risk
+
+# Generate Text-Based PDF-Style Report
+@timed("generate_text_report")
+def generate_text_report(assessment):
+    """Generate a formatted text report that can be saved as PDF"""
+    score, level, risk_factors = assessment_risk(assessment)
+    
+    report = f"""
+═══════════════════════════════════════════════════════════════
+          HOME CARE RISK ASSESSMENT REPORT
+═══════════════════════════════════════════════════════════════
+
+CLIENT INFORMATION
+─────────────────────────────────────────────────────────────
+Name:               {assessment['first_name']} {assessment['last_name']}
+Client ID:          {assessment['client_id']}
+Age:                {assessment['age']} years
+Height:             {assessment['height']}
+Weight:             {assessment['weight']} lbs
+Assessment Date:    {assessment.get('timestamp', 'N/A')}
+
+
+RISK ASSESSMENT SCORE
+─────────────────────────────────────────────────────────────
+Risk Score:         {score:.0f} points
+Risk Level:         {level.upper()}
+
+
+IDENTIFIED RISK FACTORS
+─────────────────────────────────────────────────────────────
+"""
+    
+    if risk_factors:
+        for factor in risk_factors:
+            report += f"• {factor}\n"
+    else:
+        report += "• No significant risk factors identified\n"
+    
+    report += """
+
+MEDICAL INFORMATION
+─────────────────────────────────────────────────────────────
+"""
+    
+    # Medical Diagnoses
+    report += f"\nMedical Diagnoses:  {assessment['diagnoses']}\n"
+    if assessment['diagnoses'] == "Yes" and assessment['diagnoses_details']:
+        report += f"Details: {assessment['diagnoses_details']}\n"
+    
+    # Seizure Information
+    report += f"\nSeizure History:    {assessment['seizures']}\n"
+    if assessment['seizures'] == "Yes":
+        if assessment.get('seizure_frequency'):
+            report += f"Frequency: {assessment['seizure_frequency']}\n"
+        if assessment.get('seizure_severity'):
+            report += f"Severity: {assessment['seizure_severity']}\n"
+        if assessment.get('seizure_type'):
+            report += f"Additional Details: {assessment['seizure_type']}\n"
+    
+    # Medications
+    report += f"\nCurrent Medications: {assessment['medications']}\n"
+    if assessment['medications'] == "Yes" and assessment['medication_details']:
+        report += f"Details: {assessment['medication_details']}\n"
+    
+    # Medical Assistance
+    report += f"\nRequires Medical Assistance: {assessment['assist_medical']}\n"
+    
+    # Additional Notes
+    if assessment.get('additional_notes'):
+        report += f"\nAdditional Notes:\n{assessment['additional_notes']}\n"
+    
+    report += """
+─────────────────────────────────────────────────────────────
+
+RISK LEVEL GUIDELINES:
+• Low (0-34):       Standard care protocols apply
+• Moderate (35-59): Enhanced monitoring recommended
+• High (60-79):     Specialized care required
+• Critical (80+):   Immediate intervention protocols
+
+═══════════════════════════════════════════════════════════════
+Report generated by Home Care Risk Assessment System
+Confidential - HIPAA Protected Information
+═══════════════════════════════════════════════════════════════
+"""
+    
+    return report
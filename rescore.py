@@ -0,0 +1,94 @@
+"""Background re-scoring of stored results after a rule change.
+
+Every stored result carries the rule version that produced it. The job
+walks the results of each older version in id order and commits them
+chunk by chunk, so readers keep seeing the old values until a chunk
+commits. An interrupted job resumes where it stopped, because results it
+already handled are no longer stamped with an old version.
+
+Only results whose inputs reach a changed rule section are recomputed
+and rewritten. The others are just restamped. When the old version's
+config was never saved, every result of that version is recomputed.
+A row edited or deleted while its chunk was being scored is skipped
+rather than overwritten.
+"""
+import threading
+
+from rules import changed_sections
+from scoring import RULES, calculate_risk_scores_batch, with_risk
+
+RESCORE_CHUNK_SIZE = 500
+
+
+class RescoreJob:
+    """Re-scores results stored under older rule versions in resumable chunks"""
+
+    def __init__(self, store, chunk_size=RESCORE_CHUNK_SIZE):
+        self.store = store
+        self.chunk_size = chunk_size
+        self.total = 0
+        self.done = 0
+        self.rescored = 0
+        self.restamped = 0
+        self.skipped = 0
+        self.error = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def stale_versions(self):
+        """{old rule version: count} of results still to re-score"""
+        return {v: n for v, n in self.store.rule_version_counts().items() if v != RULES.version}
+
+    def run(self, progress=None):
+        """Re-score every stale result, calling `progress(done, total)` after each chunk"""
+        self.store.save_rule_config(RULES.version, RULES.config)
+        stale = self.stale_versions()
+        self.total = sum(stale.values())
+        self.done = 0
+        for version in stale:
+            old_config = self.store.rule_config(version) if version is not None else None
+            sections = changed_sections(old_config, RULES.config) if old_config is not None else None
+            after_id = None
+            while not self._stop.is_set():
+                rows = self.store.page_by_rule_version(version, after_id, self.chunk_size)
+                if not rows:
+                    break
+                touched = [r for r in rows if RULES.touches(r, sections)]
+                unchanged = [r["id"] for r in rows if not RULES.touches(r, sections)]
+                for record, result in zip(touched, calculate_risk_scores_batch(touched)):
+                    with_risk(record, result)
+                stored, restamped = self.store.save_rescored(touched, unchanged, RULES.version, version)
+                after_id = rows[-1]["id"]
+                self.done += len(rows)
+                self.rescored += stored
+                self.restamped += restamped
+                # Rows written by someone else since this page was read
+                self.skipped += len(rows) - stored - restamped
+                if progress:
+                    progress(self.done, self.total)
+        return self
+
+    def _run_safely(self):
+        try:
+            self.run()
+        except Exception as e:
+            self.error = e
+
+    def start(self):
+        """Run in a daemon thread if any results are stale; returns whether it started"""
+        self.store.save_rule_config(RULES.version, RULES.config)
+        if self.running or not self.stale_versions():
+            return False
+        self._stop.clear()
+        self.error = None
+        self._thread = threading.Thread(target=self._run_safely, name="risk-app-rescore", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Stop after the current chunk commits"""
+        self._stop.set()
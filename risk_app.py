@@ -1,7 +1,23 @@
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 from datetime import datetime
 import json
-import io
+from functools import partial
+
+from scoring import RULES, assessment_risk, with_risk
+from pdf_report import generate_pdf_report, pdf_bundle, report_file_name
+from storage import SQLiteAssessmentStore, SharedAssessmentStore, DuplicateClientError, DEFAULT_DB_PATH
+from export import export_assessments, export_file_name, export_mime
+from validation import (
+    blank_assessment, step_complete, seizure_details_complete,
+    FREQUENCY_OPTIONS, SEVERITY_OPTIONS,
+)
+from importer import import_assessments
+from rescore import RescoreJob
+from archive import ColumnarArchive, DEFAULT_ARCHIVE_PATH
+from drafts import DraftWriter
+import instrumentation
+from instrumentation import span, timed
 
 # Page Config
 st.set_page_config(
@@ -63,198 +79,62 @@ if "page" not in st.session_state:
 if "step" not in st.session_state:
     st.session_state.step = 1
 if "data" not in st.session_state:
-    st.session_state.data = {
-        "first_name": "", "last_name": "", "client_id": "",
-        "age": "", "height": "", "weight": "",
-        "diagnoses": "No", "diagnoses_details": "",
-        "seizures": "No", "seizure_frequency": "",
-        "seizure_type": "", "seizure_severity": "",
-        "medications": "No", "medication_details": "",
-        "assist_medical": "No", "additional_notes": "",
-        "timestamp": ""
-    }
-if "assessments" not in st.session_state:
-    st.session_state.assessments = []
-
-# Risk Calculation Engine
-def calculate_risk_score(assessment):
-    """Calculate weighted risk score based on medical factors"""
-    score = 0
-    risk_factors = []
-    
-    try:
-        # Age factor (0-20 points)
-        age = int(assessment.get('age', 0))
-        if age > 85:
-            score += 25
-            risk_factors.append("Very advanced age (>85)")
-        elif age > 75:
-            score += 20
-            risk_factors.append("Advanced age (>75)")
-        elif age > 65:
-            score += 10
-            risk_factors.append("Senior age (65-75)")
-        
-        # Seizure assessment (0-55 points) - WEIGHTED HEAVILY
-        if assessment.get('seizures') == "Yes":
-            seizure_freq = assessment.get('seizure_frequency', '').lower()
-            seizure_severity = assessment.get('seizure_severity', '').lower()
-            
-            # Frequency scoring
-            if 'daily' in seizure_freq or 'multiple' in seizure_freq:
-                score += 30
-                risk_factors.append("Daily/frequent seizures")
-            elif 'weekly' in seizure_freq:
-                score += 20
-                risk_factors.append("Weekly seizures")
-            elif 'monthly' in seizure_freq:
-                score += 15
-                risk_factors.append("Monthly seizures")
-            else:
-                score += 10
-                risk_factors.append("Seizure history")
-            
-            # Severity scoring
-            if 'grand mal' in seizure_severity or 'tonic-clonic' in seizure_severity or 'severe' in seizure_severity:
-                score += 25
-                risk_factors.append("Severe seizure type")
-            elif 'moderate' in seizure_severity:
-                score += 15
-                risk_factors.append("Moderate seizures")
-            else:
-                score += 10
-        
-        # Medical diagnoses (0-15 points)
-        if assessment.get('diagnoses') == "Yes":
-            diagnoses = assessment.get('diagnoses_details', '').lower()
-            if any(term in diagnoses for term in ['heart', 'cardiac', 'stroke', 'diabetes', 'cancer']):
-                score += 15
-                risk_factors.append("Serious medical condition")
-            else:
-                score += 10
-                risk_factors.append("Medical diagnosis present")
-        
-        # Medications (0-10 points)
-        if assessment.get('medications') == "Yes":
-            score += 10
-            risk_factors.append("Multiple medications")
-        
-        # Medical assistance required (0-15 points)
-        if assessment.get('assist_medical') == "Yes":
-            score += 15
-            risk_factors.append("Requires medical assistance")
-        
-        # Physical factors
-        weight = float(assessment.get('weight', 0))
-        if weight > 250:
-            score += 10
-            risk_factors.append("High body weight")
-        elif weight < 100:
-            score += 8
-            risk_factors.append("Low body weight")
-            
-    except (ValueError, TypeError):
-        pass
-    
-    # Determine risk level
-    if score >= 80:
-        level = "Critical"
-    elif score >= 60:
-        level = "High"
-    elif score >= 35:
-        level = "Moderate"
-    else:
-        level = "Low"
-    
-    return score, level, risk_factors
+    st.session_state.data = blank_assessment()
+# Assessment Storage
+@st.cache_resource
+def get_store(path=DEFAULT_DB_PATH):
+    """Open the assessment store once per server process, shared by all sessions"""
+    return SharedAssessmentStore(SQLiteAssessmentStore(path, scorer=assessment_risk))
 
-# Generate Text-Based PDF-Style Report
-def generate_text_report(assessment):
-    """Generate a formatted text report that can be saved as PDF"""
-    score, level, risk_factors = calculate_risk_score(assessment)
-    
-    report = f"""
-═══════════════════════════════════════════════════════════════
-          HOME CARE RISK ASSESSMENT REPORT
-═══════════════════════════════════════════════════════════════
-
-CLIENT INFORMATION
-─────────────────────────────────────────────────────────────
-Name:               {assessment['first_name']} {assessment['last_name']}
-Client ID:          {assessment['client_id']}
-Age:                {assessment['age']} years
-Height:             {assessment['height']}
-Weight:             {assessment['weight']} lbs
-Assessment Date:    {assessment.get('timestamp', 'N/A')}
-
-
-RISK ASSESSMENT SCORE
-─────────────────────────────────────────────────────────────
-Risk Score:         {score:.0f} points
-Risk Level:         {level.upper()}
-
-
-IDENTIFIED RISK FACTORS
-─────────────────────────────────────────────────────────────
-"""
-    
-    if risk_factors:
-        for factor in risk_factors:
-            report += f"• {factor}\n"
-    else:
-        report += "• No significant risk factors identified\n"
-    
-    report += """
+store = get_store()
 
-MEDICAL INFORMATION
-─────────────────────────────────────────────────────────────
-"""
-    
-    # Medical Diagnoses
-    report += f"\nMedical Diagnoses:  {assessment['diagnoses']}\n"
-    if assessment['diagnoses'] == "Yes" and assessment['diagnoses_details']:
-        report += f"Details: {assessment['diagnoses_details']}\n"
-    
-    # Seizure Information
-    report += f"\nSeizure History:    {assessment['seizures']}\n"
-    if assessment['seizures'] == "Yes":
-        if assessment.get('seizure_frequency'):
-            report += f"Frequency: {assessment['seizure_frequency']}\n"
-        if assessment.get('seizure_severity'):
-            report += f"Severity: {assessment['seizure_severity']}\n"
-        if assessment.get('seizure_type'):
-            report += f"Additional Details: {assessment['seizure_type']}\n"
-    
-    # Medications
-    report += f"\nCurrent Medications: {assessment['medications']}\n"
-    if assessment['medications'] == "Yes" and assessment['medication_details']:
-        report += f"Details: {assessment['medication_details']}\n"
-    
-    # Medical Assistance
-    report += f"\nRequires Medical Assistance: {assessment['assist_medical']}\n"
-    
-    # Additional Notes
-    if assessment.get('additional_notes'):
-        report += f"\nAdditional Notes:\n{assessment['additional_notes']}\n"
-    
-    report += """
-─────────────────────────────────────────────────────────────
-
-RISK LEVEL GUIDELINES:
-• Low (0-34):       Standard care protocols apply
-• Moderate (35-59): Enhanced monitoring recommended
-• High (60-79):     Specialized care required
-• Critical (80+):   Immediate intervention protocols
-
-═══════════════════════════════════════════════════════════════
-Report generated by Home Care Risk Assessment System
-Confidential - HIPAA Protected Information
-═══════════════════════════════════════════════════════════════
-"""
-    
-    return report
+@st.cache_resource
+def rescore_job():
+    """Start re-scoring results from older rule versions once per server process"""
+    job = RescoreJob(store)
+    job.start()
+    return job
+
+rescore = rescore_job()
+
+@st.cache_resource
+def get_archive():
+    """Memory-map the history archive ($RISK_APP_ARCHIVE) once per server process"""
+    return ColumnarArchive(DEFAULT_ARCHIVE_PATH) if DEFAULT_ARCHIVE_PATH else None
+
+archive = get_archive()
+
+@st.cache_resource
+def draft_writer():
+    """One write-behind draft queue per server process"""
+    return DraftWriter(store)
+
+drafts = draft_writer()
+
+# Deferred Downloads
+# Called by st.download_button only when clicked; cached per record content
+DOWNLOAD_CACHE_SIZE = 256
+
+@st.cache_data(max_entries=DOWNLOAD_CACHE_SIZE, show_spinner=False)
+def report_download(assessment):
+    return generate_pdf_report(assessment)
+
+@st.cache_data(max_entries=DOWNLOAD_CACHE_SIZE, show_spinner=False)
+def json_download(assessment):
+    return json.dumps(assessment, indent=2).encode("utf-8")
+
+# Deferred downloads must return bytes, not the spooled file object
+def export_all(fmt, compress=False, latest_only=False):
+    records = store.iter_assessments(latest_only=latest_only)
+    with export_assessments(records, fmt, scorer=assessment_risk, compress=compress) as output:
+        return output.read()
+
+def reports_bundle(filters):
+    with pdf_bundle(store.iter_assessments(**filters)) as bundle:
+        return bundle.read()
 
 # HOME PAGE
+@timed("home")
 def home():
     st.markdown('<div class="portal-card">', unsafe_allow_html=True)
     st.markdown('<h1 class="portal-title">🏥 Home Care Risk Assessment</h1>', unsafe_allow_html=True)
@@ -275,27 +155,81 @@ def home():
     st.markdown('</div>', unsafe_allow_html=True)
 
 # ASSESSMENT PAGE
+@timed("assessment")
 def assessment():
-    data = st.session_state.data
     st.markdown('<div class="assessment-card">', unsafe_allow_html=True)
     st.markdown("<h2 style='text-align:center; color:#2c3e50;'>Client Risk Assessment</h2>", unsafe_allow_html=True)
     st.markdown("<p style='text-align:center; color:#636e72; margin-bottom:2rem;'>Complete all steps for comprehensive evaluation</p>", unsafe_allow_html=True)
     
+    wizard_step()
+
+    if st.button("🏠 Back to Home", use_container_width=True):
+        st.session_state.page = "home"
+        st.rerun()
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+
+def rerun_fragment():
+    """Rerun only the calling fragment, or the whole page when the fragment
+    ran as part of a full rerun (where a fragment-scoped one is refused)"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+# Radio widgets whose answers live under their own session keys
+RADIO_KEYS = {"dx": "diagnoses", "meds": "medications", "seizures": "seizures"}
+
+def go_to_step(step):
+    """Move the wizard to `step`, autosaving the draft off the request path"""
+    st.session_state.step = step
+    client_id = st.session_state.data["client_id"]
+    previous = st.session_state.get("draft_client_id")
+    if previous and previous != client_id:
+        # The client ID was edited: don't leave a draft behind under the old one
+        drafts.discard(previous)
+    drafts.save(client_id, step, st.session_state.data)
+    st.session_state.draft_client_id = client_id
+    rerun_fragment()
+
+def resume_draft():
+    """Load a saved draft by client ID into the wizard"""
+    with st.expander("↩️ Resume a saved draft"):
+        client_id = st.text_input("Client ID", key="resume_client_id").strip()
+        if st.button("Resume", key="resume_draft", use_container_width=True) and client_id:
+            draft = drafts.load(client_id)
+            if draft is None:
+                st.info(f"🔍 No saved draft for client {client_id}.")
+                return
+            step, data, saved_at = draft
+            st.session_state.data = {**blank_assessment(), **data}
+            for key, field in RADIO_KEYS.items():
+                st.session_state[key] = st.session_state.data[field] or "No"
+            st.session_state.step = step
+            st.session_state.draft_client_id = client_id
+            st.toast(f"Resumed draft saved {saved_at:%Y-%m-%d %H:%M}")
+            rerun_fragment()
+
+# Moving between steps reruns only this fragment, not the page around it
+@st.fragment
+@timed("wizard_step")
+def wizard_step():
+    data = st.session_state.data
     progress = {1: 0.25, 2: 0.50, 3: 0.75, 4: 1.0}
     st.progress(progress[st.session_state.step])
 
     # Step 1: Client Identification
     if st.session_state.step == 1:
         st.markdown("<div class='step-header'>Step 1 of 4 • Client Identification</div>", unsafe_allow_html=True)
+        resume_draft()
         with st.form("step1"):
             data["first_name"] = st.text_input("First Name*", value=data["first_name"])
             data["last_name"] = st.text_input("Last Name*", value=data["last_name"])
             data["client_id"] = st.text_input("Client ID*", value=data["client_id"])
             
             if st.form_submit_button("Next →", use_container_width=True, type="primary"):
-                if data["first_name"] and data["last_name"] and data["client_id"]:
-                    st.session_state.step = 2
-                    st.rerun()
+                if step_complete(data, 1):
+                    go_to_step(2)
                 else:
                     st.error("⚠️ Please fill in all required fields")
 
@@ -313,13 +247,11 @@ def assessment():
             col_back, col_next = st.columns(2)
             with col_back:
                 if st.form_submit_button("← Back"):
-                    st.session_state.step = 1
-                    st.rerun()
+                    go_to_step(1)
             with col_next:
                 if st.form_submit_button("Next →", use_container_width=True, type="primary"):
-                    if data["age"] and data["height"] and data["weight"]:
-                        st.session_state.step = 3
-                        st.rerun()
+                    if step_complete(data, 2):
+                        go_to_step(3)
                     else:
                         st.error("⚠️ Please complete all fields")
 
@@ -354,12 +286,10 @@ def assessment():
             col_back, col_next = st.columns(2)
             with col_back:
                 if st.form_submit_button("← Back"):
-                    st.session_state.step = 2
-                    st.rerun()
+                    go_to_step(2)
             with col_next:
                 if st.form_submit_button("Next →", use_container_width=True, type="primary"):
-                    st.session_state.step = 4
-                    st.rerun()
+                    go_to_step(4)
 
     # Step 4: Seizure Assessment & Care Requirements
     elif st.session_state.step == 4:
@@ -374,14 +304,14 @@ def assessment():
                 
                 data["seizure_frequency"] = st.selectbox(
                     "Seizure Frequency*",
-                    ["Select frequency", "Daily or multiple times per day", "Weekly", "Monthly", "Less than monthly", "Rare/controlled"],
-                    index=0 if not data.get("seizure_frequency") else ["Select frequency", "Daily or multiple times per day", "Weekly", "Monthly", "Less than monthly", "Rare/controlled"].index(data.get("seizure_frequency", "Select frequency"))
+                    FREQUENCY_OPTIONS,
+                    index=0 if not data.get("seizure_frequency") else FREQUENCY_OPTIONS.index(data.get("seizure_frequency", "Select frequency"))
                 )
                 
                 data["seizure_severity"] = st.selectbox(
                     "Seizure Type/Severity*",
-                    ["Select type", "Grand mal/Tonic-clonic (severe)", "Moderate (loss of consciousness)", "Mild (absence/petit mal)", "Controlled with medication"],
-                    index=0 if not data.get("seizure_severity") else ["Select type", "Grand mal/Tonic-clonic (severe)", "Moderate (loss of consciousness)", "Mild (absence/petit mal)", "Controlled with medication"].index(data.get("seizure_severity", "Select type"))
+                    SEVERITY_OPTIONS,
+                    index=0 if not data.get("seizure_severity") else SEVERITY_OPTIONS.index(data.get("seizure_severity", "Select type"))
                 )
                 
                 data["seizure_type"] = st.text_area(
@@ -398,6 +328,7 @@ def assessment():
             data["assist_medical"] = st.radio(
                 "Will the caregiver need to assist with medical tasks?",
                 ["No", "Yes"],
+                index=int(data.get("assist_medical") == "Yes"),
                 horizontal=True,
                 help="Examples: medication administration, wound care, mobility assistance, monitoring vitals"
             )
@@ -412,182 +343,409 @@ def assessment():
             col_back, col_submit = st.columns(2)
             with col_back:
                 if st.form_submit_button("← Back"):
-                    st.session_state.step = 3
-                    st.rerun()
+                    go_to_step(3)
             with col_submit:
                 if st.form_submit_button("📊 Submit Assessment", use_container_width=True, type="primary"):
                     # Validation for seizure details
-                    if data["seizures"] == "Yes":
-                        if data.get("seizure_frequency") == "Select frequency" or data.get("seizure_severity") == "Select type":
-                            st.error("⚠️ Please complete all seizure assessment fields")
-                            st.stop()
-                    
-                    # Add timestamp
-                    data["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    
-                    # Save assessment
-                    st.session_state.assessments.append(data.copy())
-                    
-                    # Reset data
-                    st.session_state.data = {
-                        "first_name": "", "last_name": "", "client_id": "",
-                        "age": "", "height": "", "weight": "",
-                        "diagnoses": "No", "diagnoses_details": "",
-                        "seizures": "No", "seizure_frequency": "",
-                        "seizure_type": "", "seizure_severity": "",
-                        "medications": "No", "medication_details": "",
-                        "assist_medical": "No", "additional_notes": "",
-                        "timestamp": ""
-                    }
-                    st.session_state.step = 1
-                    st.session_state.page = "admin"
-                    st.success("✅ Assessment completed successfully!")
-                    st.rerun()
+                    if not seizure_details_complete(data):
+                        st.error("⚠️ Please complete all seizure assessment fields")
+                    else:
+                        # Add timestamp
+                        data["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                        
+                        # Save assessment
+                        try:
+                            store.add(with_risk(data.copy()))
+                        except DuplicateClientError:
+                            st.error(f"⚠️ Client ID {data['client_id']} has already been assessed")
+                        else:
+                            drafts.discard(data["client_id"])
+                            st.session_state.pop("draft_client_id", None)
+                            # Reset data
+                            st.session_state.data = blank_assessment()
+                            st.session_state.step = 1
+                            st.session_state.page = "admin"
+                            st.success("✅ Assessment completed successfully!")
+                            # Switching pages needs a full rerun
+                            st.rerun()
 
-    if st.button("🏠 Back to Home", use_container_width=True):
-        st.session_state.page = "home"
+# ADMIN DASHBOARD
+RISK_LEVELS = ["Low", "Moderate", "High", "Critical"]
+RISK_COLORS = {"Low": "#10b981", "Moderate": "#f59e0b", "High": "#ef4444", "Critical": "#991b1b"}
+TREND_PERIODS = {"Weekly": "week", "Daily": "day"}
+# Totals over every stored assessment, or each client's latest one only
+COUNT_MODES = ["All assessments", "Latest per client"]
+LATEST_CLIENTS_LIMIT = 100
+SORT_OPTIONS = {
+    "Newest first": ("date", True),
+    "Oldest first": ("date", False),
+    "Highest score": ("score", True),
+    "Lowest score": ("score", False),
+}
+# Offered first, and only, while a search is active
+SEARCH_SORT_OPTIONS = {"Best match": ("relevance", False), **SORT_OPTIONS}
+PAGE_SIZE_OPTIONS = [10, 25, 50, 100]
+DEFAULT_PAGE_SIZE = 25
+REFRESH_INTERVAL = "5s"
+
+def trend_columns(trend):
+    """Pivot risk_trend() rows into a Period column and one count column per risk level"""
+    buckets = sorted({row["bucket"] for row in trend})
+    index = {bucket: i for i, bucket in enumerate(buckets)}
+    columns = {"Period": buckets, **{level: [0] * len(buckets) for level in RISK_LEVELS}}
+    for row in trend:
+        columns.setdefault(row["risk_level"], [0] * len(buckets))[index[row["bucket"]]] = row["assessments"]
+    return columns
+
+def history_rows(history):
+    """One row per assessment of a client with the change from the previous score"""
+    rows = []
+    previous = None
+    for record in history:
+        score, level = assessment_risk(record)[:2]
+        rows.append({
+            "Date": record.get("timestamp", "N/A"),
+            "Risk Level": level,
+            "Risk Score": score,
+            "Change": None if previous is None else score - previous,
+        })
+        previous = score
+    return rows
+
+@st.fragment(run_every=REFRESH_INTERVAL)
+def watch_for_changes():
+    """Rerun the dashboard only when another session has changed the data"""
+    if store.version() != st.session_state.get("seen_version"):
         st.rerun()
+
+# Admin panels rerun on their own when their widgets change
+@st.fragment
+@timed("summary_panel")
+def summary_panel():
+    """Metrics, risk trends and latest assessment per client"""
+    mode = st.radio("Count", COUNT_MODES, horizontal=True, key="count_mode")
+    stats = store.aggregates() if mode == COUNT_MODES[0] else store.client_aggregates()
+    total = stats.total
+    high_risk = stats.high_risk
     
-    st.markdown('</div>', unsafe_allow_html=True)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total Assessments" if mode == COUNT_MODES[0] else "Clients", total)
+    with col2:
+        st.metric("High/Critical Risk", high_risk)
+    with col3:
+        avg_score = stats.average_score
+        st.metric("Average Risk Score", f"{avg_score:.0f}")
+    
+    # Risk trends, read from the incrementally maintained rollups
+    with st.expander("📈 Risk Trends"):
+        period = st.radio("Period", list(TREND_PERIODS), horizontal=True, key="trend_period")
+        trend = trend_columns(store.risk_trend(TREND_PERIODS[period]))
+        levels_present = list(trend)[1:]
+        st.bar_chart(
+            trend, x="Period", y=levels_present,
+            color=[RISK_COLORS.get(level, "#636e72") for level in levels_present],
+        )
+    
+    # Older assessments kept in the columnar archive, read from its risk columns only
+    if archive is not None:
+        archive.refresh()
+        with st.expander(f"🗄️ Historical Archive ({len(archive)} assessments)"):
+            archived = archive.aggregates()
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Archived Assessments", archived.total)
+            with col2:
+                st.metric("High/Critical Risk", archived.high_risk)
+            with col3:
+                st.metric("Average Risk Score", f"{archived.average_score:.0f}")
+    
+    # Each client's latest assessment and change since the previous one
+    with st.expander(f"👥 Latest Assessment per Client ({store.client_count()} clients)"):
+        st.dataframe(
+            [
+                {
+                    "Client ID": c["client_id"],
+                    "Name": c["name"],
+                    "Assessments": c["assessment_count"],
+                    "Latest": c["timestamp"],
+                    "Risk Level": c["risk_level"],
+                    "Risk Score": c["risk_score"],
+                    "Change": c["score_delta"],
+                }
+                for c in store.latest_per_client(limit=LATEST_CLIENTS_LIMIT)
+            ],
+            use_container_width=True, hide_index=True,
+        )
+        st.caption(f"The {LATEST_CLIENTS_LIMIT} most recently assessed clients")
 
-# ADMIN DASHBOARD
-def admin():
-    st.markdown('<div class="assessment-card">', unsafe_allow_html=True)
-    st.markdown("<h2 style='text-align:center; color:#2c3e50;'>📊 Admin Dashboard</h2>", unsafe_allow_html=True)
-    st.markdown("<p style='text-align:center; color:#636e72; margin-bottom:2rem;'>All Completed Risk Assessments</p>", unsafe_allow_html=True)
+@st.fragment
+@timed("records_panel")
+def records_panel():
+    """Search, filters and one page of assessments"""
+    # Search, filters, sorting and pagination (applied by the store before rendering)
+    search = st.text_input(
+        "🔎 Search", key="filter_search",
+        placeholder="Diagnoses, medications, seizure details, notes, name or client ID",
+    ).strip()
+    col1, col2 = st.columns(2)
+    with col1:
+        levels = st.multiselect("Risk Level", RISK_LEVELS, key="filter_levels")
+        client_id = st.text_input("Client ID", key="filter_client_id").strip()
+    with col2:
+        dates = st.date_input("Assessment Date", value=(), key="filter_dates")
+        if search:
+            sort_options = SEARCH_SORT_OPTIONS
+            sort = st.selectbox("Sort By", list(sort_options), key="sort_by_search")
+        else:
+            sort_options = SORT_OPTIONS
+            sort = st.selectbox("Sort By", list(sort_options), key="sort_by")
     
-    if not st.session_state.assessments:
-        st.info("📋 No assessments have been submitted yet. Create your first assessment to get started.")
-    else:
-        # Summary metrics
-        total = len(st.session_state.assessments)
-        high_risk = sum(1 for a in st.session_state.assessments if calculate_risk_score(a)[1] in ["High", "Critical"])
-        
+    filters = {
+        "risk_levels": levels,
+        "client_id": client_id,
+        "date_from": dates[0] if len(dates) > 0 else None,
+        "date_to": dates[-1] if len(dates) > 0 else None,
+        "search": search,
+    }
+    matches = store.count(**filters)
+    
+    # Longitudinal history of the selected client
+    history = store.client_history(client_id) if client_id else []
+    if history:
+        with st.expander(f"🕒 History for {client_id} ({len(history)} assessments)", expanded=True):
+            rows = history_rows(history)
+            if len(rows) > 1:
+                st.line_chart(rows, x="Date", y="Risk Score")
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        page_size = st.selectbox("Per Page", PAGE_SIZE_OPTIONS, index=PAGE_SIZE_OPTIONS.index(DEFAULT_PAGE_SIZE), key="page_size")
+    pages = max(1, -(-matches // page_size))
+    with col2:
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, key="page_number")
+    with col3:
+        st.markdown(f"<p style='margin-top:2rem; color:#636e72;'>{matches} matching • {pages} page(s)</p>", unsafe_allow_html=True)
+    
+    # Every matching report as PDF in one ZIP, rendered only when clicked
+    if matches:
+        st.download_button(
+            label=f"🗂️ Download {matches} PDF Report(s) (ZIP)",
+            data=partial(reports_bundle, filters),
+            key="reports_zip",
+            file_name=f"Risk_Reports_{datetime.now().strftime('%Y%m%d')}.zip",
+            mime="application/zip",
+            use_container_width=True
+        )
+    
+    sort_key, descending = sort_options[sort]
+    page_rows = store.query(
+        **filters, sort=sort_key, descending=descending,
+        limit=page_size, offset=(min(page, pages) - 1) * page_size,
+    )
+    if not page_rows:
+        st.info("🔍 No assessments match the current filters.")
+    
+    # Display each assessment on the current page
+    for assessment in page_rows:
+        assessment_details(assessment)
+
+def assessment_details(assessment, expanded=False, key_prefix=""):
+    """One assessment as an expander with its risk, answers and downloads.
+
+    `key_prefix` keeps widget keys unique when a record shows in two panels.
+    """
+    score, level, risk_factors = assessment_risk(assessment)
+    
+    risk_class = f"risk-{level.lower()}"
+    name = f"{assessment['first_name']} {assessment['last_name']}"
+    
+    with st.expander(f"**{name}** • ID: {assessment['client_id']} • Risk: {level} ({score:.0f})", expanded=expanded):
+        # Client info
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Total Assessments", total)
+            st.markdown(f"**Age:** {assessment['age']}")
         with col2:
-            st.metric("High/Critical Risk", high_risk)
+            st.markdown(f"**Height:** {assessment['height']}")
         with col3:
-            avg_score = sum(calculate_risk_score(a)[0] for a in st.session_state.assessments) / total
-            st.metric("Average Risk Score", f"{avg_score:.0f}")
+            st.markdown(f"**Weight:** {assessment['weight']} lbs")
+        
+        st.markdown(f"**Assessment Date:** {assessment.get('timestamp', 'N/A')}")
+        
+        # Risk badge
+        st.markdown(f"<div class='risk-badge {risk_class}'>{level} Risk - Score: {score:.0f}</div>", unsafe_allow_html=True)
+        
+        # Risk factors
+        if risk_factors:
+            st.markdown("**Identified Risk Factors:**")
+            for factor in risk_factors:
+                st.markdown(f"• {factor}")
         
         st.divider()
         
-        # Display each assessment
-        for i, assessment in enumerate(reversed(st.session_state.assessments)):
-            score, level, risk_factors = calculate_risk_score(assessment)
-            
-            risk_class = f"risk-{level.lower()}"
-            name = f"{assessment['first_name']} {assessment['last_name']}"
-            
-            with st.expander(f"**{name}** • ID: {assessment['client_id']} • Risk: {level} ({score:.0f})", expanded=False):
-                # Client info
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.markdown(f"**Age:** {assessment['age']}")
-                with col2:
-                    st.markdown(f"**Height:** {assessment['height']}")
-                with col3:
-                    st.markdown(f"**Weight:** {assessment['weight']} lbs")
-                
-                st.markdown(f"**Assessment Date:** {assessment.get('timestamp', 'N/A')}")
-                
-                # Risk badge
-                st.markdown(f"<div class='risk-badge {risk_class}'>{level} Risk - Score: {score:.0f}</div>", unsafe_allow_html=True)
-                
-                # Risk factors
-                if risk_factors:
-                    st.markdown("**Identified Risk Factors:**")
-                    for factor in risk_factors:
-                        st.markdown(f"• {factor}")
-                
-                st.divider()
-                
-                # Medical details
-                if assessment['diagnoses'] == "Yes":
-                    st.markdown("**Medical Diagnoses:** Yes")
-                    if assessment['diagnoses_details']:
-                        st.markdown(f"_{assessment['diagnoses_details']}_")
-                
-                if assessment['seizures'] == "Yes":
-                    st.markdown("**⚠️ Seizure History:** Yes")
-                    if assessment.get('seizure_frequency'):
-                        st.markdown(f"**Frequency:** {assessment['seizure_frequency']}")
-                    if assessment.get('seizure_severity'):
-                        st.markdown(f"**Severity:** {assessment['seizure_severity']}")
-                    if assessment.get('seizure_type'):
-                        st.markdown(f"**Details:** _{assessment['seizure_type']}_")
-                
-                if assessment['medications'] == "Yes":
-                    st.markdown("**Current Medications:** Yes")
-                    if assessment['medication_details']:
-                        st.markdown(f"_{assessment['medication_details']}_")
-                
-                st.markdown(f"**Requires Medical Assistance:** {assessment['assist_medical']}")
-                
-                if assessment.get('additional_notes'):
-                    st.markdown(f"**Additional Notes:** _{assessment['additional_notes']}_")
-                
-                # Download options
-                st.divider()
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    # Text report (can be saved as PDF)
-                    text_report = generate_text_report(assessment)
-                    st.download_button(
-                        label="📄 Download PDF Report",
-                        data=text_report,
-                        file_name=f"Risk_Assessment_{assessment['client_id']}_{assessment['last_name']}.txt",
-                        mime="text/plain",
-                        use_container_width=True,
-                        help="Download as text file - can be printed or saved as PDF"
-                    )
-                
-                with col2:
-                    # JSON data export
-                    json_data = json.dumps(assessment, indent=2)
-                    st.download_button(
-                        label="💾 Download JSON Data",
-                        data=json_data,
-                        file_name=f"Assessment_Data_{assessment['client_id']}.json",
-                        mime="application/json",
-                        use_container_width=True
-                    )
-    
-    st.divider()
-    
-    # Export all assessments
-    if st.session_state.assessments:
-        st.markdown("### 📦 Export All Data")
+        # Medical details
+        if assessment['diagnoses'] == "Yes":
+            st.markdown("**Medical Diagnoses:** Yes")
+            if assessment['diagnoses_details']:
+                st.markdown(f"_{assessment['diagnoses_details']}_")
+        
+        if assessment['seizures'] == "Yes":
+            st.markdown("**⚠️ Seizure History:** Yes")
+            if assessment.get('seizure_frequency'):
+                st.markdown(f"**Frequency:** {assessment['seizure_frequency']}")
+            if assessment.get('seizure_severity'):
+                st.markdown(f"**Severity:** {assessment['seizure_severity']}")
+            if assessment.get('seizure_type'):
+                st.markdown(f"**Details:** _{assessment['seizure_type']}_")
+        
+        if assessment['medications'] == "Yes":
+            st.markdown("**Current Medications:** Yes")
+            if assessment['medication_details']:
+                st.markdown(f"_{assessment['medication_details']}_")
+        
+        st.markdown(f"**Requires Medical Assistance:** {assessment['assist_medical']}")
+        
+        if assessment.get('additional_notes'):
+            st.markdown(f"**Additional Notes:** _{assessment['additional_notes']}_")
+        
+        # Download options
+        st.divider()
         col1, col2 = st.columns(2)
         
         with col1:
-            # Export all as JSON
-            all_data = json.dumps(st.session_state.assessments, indent=2)
+            # PDF report, built only when clicked
             st.download_button(
-                label="📥 Export All (JSON)",
-                data=all_data,
-                file_name=f"All_Assessments_{datetime.now().strftime('%Y%m%d')}.json",
-                mime="application/json",
+                label="📄 Download PDF Report",
+                data=partial(report_download, assessment),
+                key=f"{key_prefix}report_{assessment['id']}",
+                file_name=report_file_name(assessment),
+                mime="application/pdf",
                 use_container_width=True
             )
         
         with col2:
-            # CSV-like format
-            csv_data = "Client ID,Name,Age,Risk Level,Risk Score,Timestamp\n"
-            for a in st.session_state.assessments:
-                score, level, _ = calculate_risk_score(a)
-                csv_data += f"{a['client_id']},{a['first_name']} {a['last_name']},{a['age']},{level},{score:.0f},{a.get('timestamp', 'N/A')}\n"
-            
+            # JSON data export, built only when clicked
             st.download_button(
-                label="📊 Export Summary (CSV)",
-                data=csv_data,
-                file_name=f"Assessment_Summary_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv",
+                label="💾 Download JSON Data",
+                data=partial(json_download, assessment),
+                key=f"{key_prefix}json_{assessment['id']}",
+                file_name=f"Assessment_Data_{assessment['client_id']}.json",
+                mime="application/json",
                 use_container_width=True
             )
+
+@st.fragment
+@timed("client_panel")
+def client_panel():
+    """Open one client's latest assessment by exact client ID"""
+    client_id = st.text_input("📂 Open Client", key="open_client", placeholder="Client ID").strip()
+    if client_id:
+        assessment = store.latest_for_client(client_id)
+        if assessment is None:
+            st.info(f"🔍 No assessment for client {client_id}.")
+        else:
+            assessment_details(assessment, expanded=True, key_prefix="open_")
+
+@st.fragment
+@timed("import_panel")
+def import_panel():
+    """Bulk import from CSV, JSON or NDJSON files"""
+    with st.expander("📤 Import Assessments (CSV / JSON / NDJSON)", expanded="import_result" in st.session_state):
+        upload = st.file_uploader("Assessment file", type=["csv", "json", "ndjson", "jsonl"], key="import_file")
+        if upload is not None and st.button("Import", key="import_run", use_container_width=True, type="primary"):
+            bar = st.progress(0.0, text="Validating and scoring...")
+            try:
+                result = import_assessments(
+                    upload, store,
+                    progress=lambda done, count: bar.progress(done / count, text=f"Processed {done} of {count} rows"),
+                )
+            except DuplicateClientError as e:
+                # Another session stored one of these clients during the import
+                st.error(f"⚠️ Nothing imported: {e}")
+            except (ValueError, UnicodeDecodeError) as e:
+                st.error(f"⚠️ Could not read file: {e}")
+            else:
+                # New rows change every other panel, so rerun the whole page
+                st.session_state.import_result = result
+                st.rerun()
+        result = st.session_state.pop("import_result", None)
+        if result is not None:
+            st.success(f"✅ Imported {result.imported} assessment(s); {result.rejected} row(s) rejected")
+            if result.errors:
+                st.dataframe(
+                    [{"Row": row, "Client ID": cid, "Error": err} for row, cid, err in result.errors],
+                    use_container_width=True, hide_index=True,
+                )
+
+@st.fragment
+@timed("export_panel")
+def export_panel():
+    """Full data and summary exports"""
+    st.markdown("### 📦 Export All Data")
+    all_format = st.radio("Full export format", ["JSON", "NDJSON"], horizontal=True, key="export_format").lower()
+    compress = st.checkbox("Compress (gzip)", key="export_gzip")
+    latest_only = st.checkbox("Latest assessment per client only", key="export_latest")
+    today = datetime.now().strftime('%Y%m%d')
+    col1, col2 = st.columns(2)
+    
+    # Exports are streamed from the store only when a button is clicked
+    with col1:
+        st.download_button(
+            label=f"📥 Export All ({all_format.upper()})",
+            data=partial(export_all, all_format, compress, latest_only),
+            file_name=export_file_name("All_Assessments", all_format, compress, today),
+            mime=export_mime(all_format, compress),
+            use_container_width=True
+        )
+    
+    with col2:
+        st.download_button(
+            label="📊 Export Summary (CSV)",
+            data=partial(export_all, "csv", compress, latest_only),
+            file_name=export_file_name("Assessment_Summary", "csv", compress, today),
+            mime=export_mime("csv", compress),
+            use_container_width=True
+        )
+
+@timed("admin")
+def admin():
+    st.markdown('<div class="assessment-card">', unsafe_allow_html=True)
+    st.markdown("<h2 style='text-align:center; color:#2c3e50;'>📊 Admin Dashboard</h2>", unsafe_allow_html=True)
+    st.markdown("<p style='text-align:center; color:#636e72; margin-bottom:2rem;'>All Completed Risk Assessments</p>", unsafe_allow_html=True)
+    
+    st.session_state.seen_version = store.version()
+    watch_for_changes()
+    # Each committed chunk changes the store version, which refreshes this
+    if rescore.running and rescore.total:
+        st.progress(
+            rescore.done / rescore.total,
+            text=f"🔄 Re-scoring with rules v{RULES.version}: {rescore.done} of {rescore.total} assessments",
+        )
+    elif rescore.error:
+        st.error(f"⚠️ Re-scoring stopped: {rescore.error}")
+    stats = store.aggregates()
+    total = stats.total
+    if not total:
+        st.info("📋 No assessments have been submitted yet. Create your first assessment to get started.")
+    else:
+        summary_panel()
+        
+        st.divider()
+        
+        client_panel()
+        
+        records_panel()
+    
+    st.divider()
+    
+    import_panel()
+    
+    st.divider()
+    
+    # Export all assessments
+    if total:
+        export_panel()
     
     st.divider()
     
@@ -597,9 +755,9 @@ def admin():
             st.session_state.page = "home"
             st.rerun()
     with col2:
-        if st.session_state.assessments and st.button("🗑️ Clear All Data", use_container_width=True):
+        if total and st.button("🗑️ Clear All Data", use_container_width=True):
             if st.session_state.get('confirm_clear'):
-                st.session_state.assessments = []
+                store.clear()
                 st.session_state.confirm_clear = False
                 st.rerun()
             else:
@@ -608,10 +766,35 @@ def admin():
     
     st.markdown('</div>', unsafe_allow_html=True)
 
+# DIAGNOSTICS (only with RISK_APP_PROFILE=1 and ?diagnostics in the URL)
+@st.cache_resource
+def metrics_server():
+    """Start the optional Prometheus /metrics endpoint once per process"""
+    return instrumentation.start_metrics_server()
+
+def diagnostics():
+    with st.expander("⏱️ Diagnostics"):
+        st.dataframe(instrumentation.summary(), use_container_width=True, hide_index=True)
+        st.download_button(
+            label="Download Prometheus metrics",
+            data=instrumentation.prometheus_text,
+            file_name="risk_app_metrics.txt",
+            mime="text/plain",
+            key="diagnostics_metrics",
+        )
+        if st.button("Reset timings", key="diagnostics_reset"):
+            instrumentation.reset()
+
 # ROUTER
-if st.session_state.page == "home":
-    home()
-elif st.session_state.page == "assessment":
-    assessment()
-elif st.session_state.page == "admin":
-    admin()
+with span("router"):
+    if st.session_state.page == "home":
+        home()
+    elif st.session_state.page == "assessment":
+        assessment()
+    elif st.session_state.page == "admin":
+        admin()
+
+if instrumentation.ENABLED:
+    metrics_server()
+    if "diagnostics" in st.query_params:
+        diagnostics()
@@ -0,0 +1,181 @@
+"""Headless command line interface for scoring and reporting on assessments.
+
+Usage:
+    python risk_cli.py score assessments.csv -o scored.ndjson
+    python risk_cli.py report assessments.json -d reports/
+    python risk_cli.py report assessments.json --zip month_end.zip
+    python risk_cli.py import census.csv --db assessments.db --duplicates replace
+    python risk_cli.py rescore --db assessments.db
+    python risk_cli.py archive history/ census_2019.json --from-db assessments.db
+    python risk_cli.py archive history/ --rescore
+
+Only the UI-independent modules are imported, so Streamlit is never loaded.
+"""
+import argparse
+import os
+import shutil
+import sys
+
+from export import EXPORT_FORMATS, export_assessments
+from importer import InvalidRow, import_assessments, read_rows
+from pdf_report import generate_pdf_report, pdf_bundle, report_file_name
+from rescore import RESCORE_CHUNK_SIZE, RescoreJob
+from report import generate_text_report
+from scoring import RULES, assessment_risk, calculate_risk_scores_batch, with_risk
+from storage import DEFAULT_DB_PATH, DEFAULT_DUPLICATE_POLICY, DUPLICATE_POLICIES, SQLiteAssessmentStore
+from validation import validate_assessment
+
+
+def load_valid_rows(paths):
+    """Read every input file, reporting invalid rows on stderr"""
+    rows = []
+    for path in paths:
+        for number, row in enumerate(read_rows(path), start=1):
+            problems = [row.error] if isinstance(row, InvalidRow) else validate_assessment(row)
+            if problems:
+                print(f"{path}:{number}: {'; '.join(problems)}", file=sys.stderr)
+            else:
+                rows.append(row)
+    return rows
+
+
+def score_command(args):
+    rows = load_valid_rows(args.files)
+    for row, result in zip(rows, calculate_risk_scores_batch(rows)):
+        with_risk(row, result)
+    output = export_assessments(rows, args.format, scorer=assessment_risk, compress=args.gzip)
+    if args.output:
+        with open(args.output, "wb") as f:
+            shutil.copyfileobj(output, f)
+    else:
+        shutil.copyfileobj(output, sys.stdout.buffer)
+    print(f"Scored {len(rows)} assessment(s)", file=sys.stderr)
+
+
+def report_command(args):
+    rows = load_valid_rows(args.files)
+    if args.zip:
+        with open(args.zip, "wb") as f:
+            shutil.copyfileobj(pdf_bundle(rows, workers=args.workers), f)
+        print(f"Wrote {len(rows)} PDF report(s) to {args.zip}", file=sys.stderr)
+        return
+    os.makedirs(args.output_dir, exist_ok=True)
+    for row in rows:
+        if args.format == "txt":
+            with open(os.path.join(args.output_dir, report_file_name(row, "txt")), "w", encoding="utf-8") as f:
+                f.write(generate_text_report(row))
+        else:
+            with open(os.path.join(args.output_dir, report_file_name(row)), "wb") as f:
+                f.write(generate_pdf_report(row))
+    print(f"Wrote {len(rows)} report(s) to {args.output_dir}", file=sys.stderr)
+
+
+def import_command(args):
+    store = SQLiteAssessmentStore(args.db, scorer=assessment_risk, duplicates=args.duplicates)
+    for path in args.files:
+        result = import_assessments(path, store, workers=args.workers)
+        for row, client_id, error in result.errors:
+            print(f"{path}:{row}: {client_id}: {error}", file=sys.stderr)
+        print(f"{path}: imported {result.imported}, rejected {result.rejected}", file=sys.stderr)
+
+
+def rescore_command(args):
+    store = SQLiteAssessmentStore(args.db, scorer=assessment_risk)
+    job = RescoreJob(store, chunk_size=args.chunk_size)
+    job.run(progress=lambda done, total: print(f"\rRe-scored {done}/{total}", end="", file=sys.stderr))
+    print(
+        f"\nRules v{RULES.version}: recomputed {job.rescored}, unchanged {job.restamped}, "
+        f"skipped {job.skipped} edited meanwhile",
+        file=sys.stderr,
+    )
+
+
+def _scored(rows, chunk_size):
+    """Stamp rows with their risk results, scoring `chunk_size` at a time"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield from (with_risk(r, result) for r, result in zip(chunk, calculate_risk_scores_batch(chunk)))
+            chunk = []
+    yield from (with_risk(r, result) for r, result in zip(chunk, calculate_risk_scores_batch(chunk)))
+
+
+def archive_command(args):
+    # Imported here: numpy would otherwise slow down every other command
+    from archive import ARCHIVE_CHUNK_SIZE, ColumnarArchive
+
+    archive = ColumnarArchive(args.archive)
+    args.chunk_size = args.chunk_size or ARCHIVE_CHUNK_SIZE
+    if args.files:
+        appended = archive.append(_scored(load_valid_rows(args.files), args.chunk_size), args.chunk_size)
+        print(f"Archived {appended} assessment(s) from {len(args.files)} file(s)", file=sys.stderr)
+    if args.from_db:
+        store = SQLiteAssessmentStore(args.from_db, scorer=assessment_risk)
+        appended = archive.append(store.iter_assessments(batch_size=args.chunk_size), args.chunk_size)
+        print(f"Archived {appended} assessment(s) from {args.from_db}", file=sys.stderr)
+    if args.rescore:
+        rescored = archive.rescore(
+            chunk_size=args.chunk_size,
+            progress=lambda done, total: print(f"\rRe-scored {done}/{total}", end="", file=sys.stderr),
+        )
+        print(f"\nRules v{RULES.version}: recomputed {rescored}", file=sys.stderr)
+    stats = archive.aggregates()
+    print(
+        f"{args.archive}: {len(archive)} assessment(s), {stats.high_risk} high/critical, "
+        f"average score {stats.average_score:.1f}",
+        file=sys.stderr,
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Home Care Risk Assessment tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    score = commands.add_parser("score", help="Score assessment files")
+    score.add_argument("files", nargs="+", help="CSV, JSON or NDJSON assessment files")
+    score.add_argument("-f", "--format", choices=list(EXPORT_FORMATS), default="ndjson")
+    score.add_argument("-o", "--output", help="Output file (default: stdout)")
+    score.add_argument("--gzip", action="store_true", help="Compress the output")
+    score.set_defaults(func=score_command)
+
+    report = commands.add_parser("report", help="Write a report per assessment")
+    report.add_argument("files", nargs="+", help="CSV, JSON or NDJSON assessment files")
+    report.add_argument("-d", "--output-dir", default="reports")
+    report.add_argument("-f", "--format", choices=["pdf", "txt"], default="pdf")
+    report.add_argument("--zip", help="Write every PDF report into this ZIP file instead")
+    report.add_argument("--workers", type=int, default=None, help="Worker processes for --zip")
+    report.set_defaults(func=report_command)
+
+    load = commands.add_parser("import", help="Import assessment files into the database")
+    load.add_argument("files", nargs="+", help="CSV, JSON or NDJSON assessment files")
+    load.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite database path (default: $RISK_APP_DB or assessments.db)")
+    load.add_argument("--workers", type=int, default=None, help="Worker processes for validation")
+    load.add_argument(
+        "--duplicates", choices=DUPLICATE_POLICIES, default=DEFAULT_DUPLICATE_POLICY,
+        help="What to do with an already stored client_id (default: $RISK_APP_DUPLICATES or append)",
+    )
+    load.set_defaults(func=import_command)
+
+    rescore = commands.add_parser("rescore", help="Re-score results stored under older rule versions")
+    rescore.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite database path (default: $RISK_APP_DB or assessments.db)")
+    rescore.add_argument("--chunk-size", type=int, default=RESCORE_CHUNK_SIZE, help="Results committed per transaction")
+    rescore.set_defaults(func=rescore_command)
+
+    history = commands.add_parser("archive", help="Append to or re-score a columnar history archive")
+    history.add_argument("archive", help="Archive directory (created if missing)")
+    history.add_argument("files", nargs="*", help="CSV, JSON or NDJSON assessment files to append")
+    history.add_argument("--from-db", help="Append every assessment in this SQLite database")
+    history.add_argument("--rescore", action="store_true", help="Re-score results from older rule versions")
+    history.add_argument("--chunk-size", type=int, help="Rows written per commit (default: 10000)")
+    history.set_defaults(func=archive_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Data-driven risk scoring rules.
+
+Weights, thresholds and keyword lists live in a versioned JSON config
+(risk_rules.json by default, or $RISK_APP_RULES). The config is compiled
+once into threshold tables and one multi-pattern matcher per keyword rule.
+"""
+import json
+import os
+import re
+from functools import lru_cache
+
+DEFAULT_RULES_PATH = os.environ.get(
+    "RISK_APP_RULES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "risk_rules.json")
+)
+# Distinct texts remembered per keyword rule (selectbox answers repeat a lot)
+KEYWORD_CACHE_SIZE = 4096
+
+# Config sections in the order their risk factors are reported, each with
+# the Yes/No answer that must be Yes for it to read its inputs (None: always)
+SECTION_GATES = {
+    "age": None,
+    "seizure_frequency": "seizures",
+    "seizure_severity": "seizures",
+    "diagnoses": "diagnoses",
+    "medications": "medications",
+    "assist_medical": "assist_medical",
+    "weight": None,
+}
+
+
+# Keyword Matching
+def _trie_regex(terms):
+    """Regex for a set of literal terms, factored into a prefix trie.
+
+    Optional suffixes are greedy, so at any position the longest term
+    starting there matches. The regex engine then does one pass over the
+    text, and the cost does not grow much as more terms are added.
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordRule:
+    """Points for free text, bucketed by the highest-priority term it contains.
+
+    Codes: 0 = rule not applied, 1..n = buckets in priority order,
+    n + 1 = the default when no term matches.
+    """
+
+    def __init__(self, spec):
+        buckets = spec.get("buckets", [])
+        default = spec.get("default", {"points": 0, "factor": None})
+        self.points = [0] + [b["points"] for b in buckets] + [default["points"]]
+        self.factors = [None] + [b.get("factor") for b in buckets] + [default.get("factor")]
+        self.default_code = len(buckets) + 1
+
+        term_codes = {}
+        for code, bucket in enumerate(buckets, start=1):
+            for term in bucket["terms"]:
+                if term:
+                    term_codes.setdefault(term.lower(), code)
+        # The matcher reports the longest term at each position; every other
+        # term matching there is a prefix of it, so fold their codes in
+        self._codes = {
+            term: min(term_codes.get(term[:end], code) for end in range(1, len(term) + 1))
+            for term, code in term_codes.items()
+        }
+        self.terms = tuple(term_codes)
+        self._pattern = re.compile(f"(?=({_trie_regex(term_codes)}))") if term_codes else None
+        self.code_for = lru_cache(maxsize=KEYWORD_CACHE_SIZE)(self._code_for)
+
+    def _code_for(self, text):
+        best = self.default_code
+        if self._pattern is not None:
+            for match in self._pattern.finditer(text.lower()):
+                code = self._codes[match.group(1)]
+                if code < best:
+                    best = code
+                    if best == 1:
+                        break
+        return best
+
+
+class ThresholdRule:
+    """Points for a number, from the first matching above/below threshold"""
+
+    def __init__(self, spec):
+        thresholds = spec.get("thresholds", [])
+        self.limits = [("above", t["above"]) if "above" in t else ("below", t["below"]) for t in thresholds]
+        self.points = [0] + [t["points"] for t in thresholds]
+        self.factors = [None] + [t.get("factor") for t in thresholds]
+
+    def code_for(self, number):
+        for code, (op, limit) in enumerate(self.limits, start=1):
+            if (number > limit) if op == "above" else (number < limit):
+                return code
+        return 0
+
+    def codes_for_array(self, values):
+        """Vectorized code_for over a NumPy array"""
+        import numpy as np
+
+        if not self.limits:
+            return np.zeros(len(values), dtype=np.int16)
+        conditions = [values > limit if op == "above" else values < limit for op, limit in self.limits]
+        return np.select(conditions, list(range(1, len(conditions) + 1)), 0).astype(np.int16)
+
+
+class FlagRule:
+    """Fixed points for a Yes answer"""
+
+    def __init__(self, spec):
+        self.points = [0, spec["points"]]
+        self.factors = [None, spec.get("factor")]
+
+
+# Rule Set
+class RuleSet:
+    """A compiled, versioned set of scoring rules"""
+
+    def __init__(self, config):
+        self.config = config
+        self.version = str(config["version"])
+        self.age = ThresholdRule(config["age"])
+        self.seizure_frequency = KeywordRule(config["seizure_frequency"])
+        self.seizure_severity = KeywordRule(config["seizure_severity"])
+        self.diagnoses = KeywordRule(config["diagnoses"])
+        self.medications = FlagRule(config["medications"])
+        self.assist_medical = FlagRule(config["assist_medical"])
+        self.weight = ThresholdRule(config["weight"])
+        levels = sorted(
+            (lvl for lvl in config["levels"] if lvl.get("min") is not None),
+            key=lambda lvl: lvl["min"], reverse=True,
+        )
+        self.level_thresholds = [(lvl["min"], lvl["level"]) for lvl in levels]
+        self.default_level = next(lvl["level"] for lvl in config["levels"] if lvl.get("min") is None)
+        # There are only a few thousand possible code combinations
+        self._results = {}
+
+    # Rules in the order their risk factors are reported
+    @property
+    def sections(self):
+        return (
+            self.age, self.seizure_frequency, self.seizure_severity, self.diagnoses,
+            self.medications, self.assist_medical, self.weight,
+        )
+
+    def level_for(self, score):
+        for minimum, level in self.level_thresholds:
+            if score >= minimum:
+                return level
+        return self.default_level
+
+    def outcome_codes(self, assessment):
+        """One code per section for an assessment.
+
+        An unparseable age stops scoring there and an unparseable weight
+        only drops the weight rule.
+        """
+        codes = [0] * 7
+        try:
+            codes[0] = self.age.code_for(int(assessment.get('age', 0)))
+            if assessment.get('seizures') == "Yes":
+                codes[1] = self.seizure_frequency.code_for(assessment.get('seizure_frequency', ''))
+                codes[2] = self.seizure_severity.code_for(assessment.get('seizure_severity', ''))
+            if assessment.get('diagnoses') == "Yes":
+                codes[3] = self.diagnoses.code_for(assessment.get('diagnoses_details', ''))
+            if assessment.get('medications') == "Yes":
+                codes[4] = 1
+            if assessment.get('assist_medical') == "Yes":
+                codes[5] = 1
+            codes[6] = self.weight.code_for(float(assessment.get('weight', 0)))
+        except (ValueError, TypeError):
+            pass
+        return codes
+
+    def result_for_codes(self, codes):
+        """(score, level, risk_factors) for a list of section codes"""
+        key = tuple(codes)
+        result = self._results.get(key)
+        if result is None:
+            score = 0
+            risk_factors = []
+            for rule, code in zip(self.sections, codes):
+                score += rule.points[code]
+                if rule.factors[code]:
+                    risk_factors.append(rule.factors[code])
+            result = self._results[key] = (score, self.level_for(score), tuple(risk_factors))
+        return result[0], result[1], list(result[2])
+
+    def score(self, assessment):
+        return self.result_for_codes(self.outcome_codes(assessment))
+
+    @staticmethod
+    def touches(assessment, sections):
+        """Whether changes to `sections` can change this assessment's result.
+
+        `sections` comes from changed_sections(); None means unknown, so
+        every assessment is touched.
+        """
+        if sections is None or "levels" in sections:
+            return True
+        return any(
+            SECTION_GATES.get(name) is None or assessment.get(SECTION_GATES[name]) == "Yes"
+            for name in sections
+        )
+
+
+def changed_sections(old_config, new_config):
+    """Names of the config sections (and "levels") that differ between two configs"""
+    return {name for name in (*SECTION_GATES, "levels") if old_config.get(name) != new_config.get(name)}
+
+
+def load_rules(path=DEFAULT_RULES_PATH):
+    """Load and compile a rule config file"""
+    with open(path, encoding="utf-8") as f:
+        return RuleSet(json.load(f))
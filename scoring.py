@@ -0,0 +1,166 @@
+import hashlib
+import json
+from collections import OrderedDict
+
+from instrumentation import timed
+from records import YES, AssessmentRecord
+from rules import load_rules
+
+# Scoring rules are compiled once at startup from the versioned config
+RULES = load_rules()
+
+# NumPy is imported inside the batch functions so that scoring a single
+# record, or importing this module, stays fast
+
+# Risk Calculation Engine
+@timed("calculate_risk_score")
+def calculate_risk_score(assessment, rules=None):
+    """Calculate weighted risk score based on medical factors.
+
+    Accepts an assessment dict or an AssessmentRecord.
+    """
+    rules = rules or RULES
+    if isinstance(assessment, AssessmentRecord):
+        return rules.result_for_codes(_record_codes(assessment, rules))
+    return rules.score(assessment)
+
+def _record_codes(record, rules):
+    """Section codes for an AssessmentRecord, using its pre-parsed fields"""
+    codes = [0] * 7
+    if record.age is None:
+        return codes
+    codes[0] = rules.age.code_for(record.age)
+    if record.seizures == YES:
+        codes[1] = rules.seizure_frequency.code_for(record.get("seizure_frequency"))
+        codes[2] = rules.seizure_severity.code_for(record.get("seizure_severity"))
+    if record.diagnoses == YES:
+        codes[3] = rules.diagnoses.code_for(record.diagnoses_details)
+    codes[4] = int(record.medications == YES)
+    codes[5] = int(record.assist_medical == YES)
+    if record.weight is not None:
+        codes[6] = rules.weight.code_for(record.weight)
+    return codes
+
+# Vectorized Batch Scoring
+def _bucket_column(values, bucket):
+    """Classify each distinct string once and broadcast the codes back"""
+    import numpy as np
+    codes = {v: bucket(v) for v in set(values)}
+    return np.fromiter((codes[v] for v in values), dtype=np.int16, count=len(values))
+
+def _parse_number(value, parse):
+    try:
+        return float(parse(value))
+    except (ValueError, TypeError, OverflowError):
+        return float("nan")
+
+def _parse_column(values, parse):
+    """Parse each distinct value once, returning (values, valid mask)"""
+    import numpy as np
+    parsed = {v: _parse_number(v, parse) for v in set(values)}
+    column = np.fromiter((parsed[v] for v in values), dtype=np.float64, count=len(values))
+    return column, ~np.isnan(column)
+
+@timed("calculate_risk_scores_batch")
+def calculate_risk_scores_batch(records, rules=None):
+    """Score many assessments at once; results match calculate_risk_score"""
+    import numpy as np
+    rules = rules or RULES
+    records = list(records)
+    n = len(records)
+    if not n:
+        return []
+
+    age, age_ok = _parse_column([r.get('age', 0) for r in records], int)
+    weight, weight_ok = _parse_column([r.get('weight', 0) for r in records], float)
+    seizures = np.array([r.get('seizures') == "Yes" for r in records])
+    diagnoses = np.array([r.get('diagnoses') == "Yes" for r in records])
+    medications = np.array([r.get('medications') == "Yes" for r in records])
+    assist = np.array([r.get('assist_medical') == "Yes" for r in records])
+
+    # An unparseable age aborts scoring in calculate_risk_score, and an
+    # unparseable weight only drops the weight factor
+    age_code = rules.age.codes_for_array(age)
+    age_code[~age_ok] = 0
+
+    freq_code = np.zeros(n, dtype=np.int16)
+    sev_code = np.zeros(n, dtype=np.int16)
+    sz = np.flatnonzero(seizures & age_ok)
+    freq_code[sz] = _bucket_column([records[i].get('seizure_frequency', '') for i in sz], rules.seizure_frequency.code_for)
+    sev_code[sz] = _bucket_column([records[i].get('seizure_severity', '') for i in sz], rules.seizure_severity.code_for)
+
+    dx_code = np.zeros(n, dtype=np.int16)
+    dx = np.flatnonzero(diagnoses & age_ok)
+    dx_code[dx] = _bucket_column([records[i].get('diagnoses_details', '') for i in dx], rules.diagnoses.code_for)
+
+    meds_code = (medications & age_ok).astype(np.int16)
+    assist_code = (assist & age_ok).astype(np.int16)
+
+    weight_code = rules.weight.codes_for_array(weight)
+    weight_code[~(age_ok & weight_ok)] = 0
+
+    columns = [age_code, freq_code, sev_code, dx_code, meds_code, assist_code, weight_code]
+    # Results depend only on the section codes, so pack the codes into one
+    # integer key and build each distinct result once
+    key = np.zeros(n, dtype=np.int64)
+    for rule, codes in zip(rules.sections, columns):
+        key = key * len(rule.points) + codes
+    _, first = np.unique(key, return_index=True)
+    results = {
+        k: rules.result_for_codes(codes)
+        for k, codes in zip(key[first].tolist(), np.stack(columns, axis=1)[first].tolist())
+    }
+
+    out = []
+    for k in key.tolist():
+        score, level, risk_factors = results[k]
+        out.append((score, level, list(risk_factors)))
+    return out
+
+# Memoized Risk Results
+# Fields that feed calculate_risk_score; the cache key is a hash of these only
+SCORING_FIELDS = (
+    "age", "weight", "seizures", "seizure_frequency", "seizure_severity",
+    "diagnoses", "diagnoses_details", "medications", "assist_medical",
+)
+RISK_CACHE_SIZE = 4096
+_risk_cache = OrderedDict()
+
+def risk_input_hash(assessment):
+    """Content hash of the fields that affect the risk score"""
+    payload = json.dumps([str(assessment.get(f, "")) for f in SCORING_FIELDS])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def assessment_risk(assessment):
+    """Return (score, level, risk_factors), reusing stored or cached results.
+
+    A stored result is served as long as its inputs are unchanged, even if
+    older rules produced it: only RescoreJob moves stored results to new
+    rules, so every reader sees the same score until it does.
+    """
+    input_hash = risk_input_hash(assessment)
+    if assessment.get("risk_hash") == input_hash:
+        return assessment["risk_score"], assessment["risk_level"], assessment["risk_factors"]
+    key = (RULES.version, input_hash)
+    if key in _risk_cache:
+        _risk_cache.move_to_end(key)
+        return _risk_cache[key]
+    result = calculate_risk_score(assessment)
+    _risk_cache[key] = result
+    if len(_risk_cache) > RISK_CACHE_SIZE:
+        _risk_cache.popitem(last=False)
+    return result
+
+def with_risk(assessment, result=None):
+    """Stamp an assessment with its score, level and risk factors.
+
+    `result` may be a precomputed (score, level, risk_factors) tuple, e.g.
+    from calculate_risk_scores_batch.
+    """
+    score, level, risk_factors = result or assessment_risk(assessment)
+    assessment.update({
+        "risk_score": score, "risk_level": level,
+        "risk_factors": list(risk_factors), "risk_hash": risk_input_hash(assessment),
+        "rule_version": RULES.version,
+    })
+    return assessment
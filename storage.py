@@ -0,0 +1,980 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from functools import partial
+
+from aggregates import RiskAggregates
+from scoring import risk_input_hash
+
+DEFAULT_DB_PATH = os.environ.get("RISK_APP_DB", "assessments.db")
+
+# What adding an assessment for a client_id that is already stored does:
+# keep both as versions, keep whichever of it and the client's latest one
+# is newer, or refuse it
+DUPLICATE_POLICIES = ("append", "replace", "reject")
+DEFAULT_DUPLICATE_POLICY = os.environ.get("RISK_APP_DUPLICATES", "append")
+
+# "relevance" ranks full-text search matches and falls back to date order
+SORT_COLUMNS = {"date": "timestamp", "score": "risk_score", "relevance": "timestamp"}
+
+# Free-text fields covered by the full-text index, and their bm25 weights
+SEARCH_FIELDS = {
+    "first_name": 10.0,
+    "last_name": 10.0,
+    "client_id": 10.0,
+    "diagnoses_details": 1.0,
+    "medication_details": 1.0,
+    "seizure_type": 1.0,
+    "additional_notes": 1.0,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    client_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    risk_level TEXT NOT NULL,
+    risk_score REAL NOT NULL,
+    data TEXT NOT NULL,
+    rule_version TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_assessments_client_id ON assessments (client_id);
+CREATE INDEX IF NOT EXISTS idx_assessments_timestamp ON assessments (timestamp);
+CREATE INDEX IF NOT EXISTS idx_assessments_risk_level ON assessments (risk_level);
+CREATE INDEX IF NOT EXISTS idx_assessments_risk_score ON assessments (risk_score);
+CREATE INDEX IF NOT EXISTS idx_assessments_rule_version ON assessments (rule_version);
+"""
+
+_SEARCH_VALUES = ", ".join(f"json_extract({{row}}.data, '$.{f}')" for f in SEARCH_FIELDS)
+
+# FTS5 index over SEARCH_FIELDS, kept up to date by triggers on every write.
+# Idempotent, so processes opening a pre-search database at once are safe.
+SEARCH_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS assessments_fts USING fts5(
+    {", ".join(SEARCH_FIELDS)},
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+INSERT INTO assessments_fts (assessments_fts, rank)
+    VALUES ('rank', 'bm25({", ".join(str(w) for w in SEARCH_FIELDS.values())})');
+CREATE TRIGGER IF NOT EXISTS assessments_fts_insert AFTER INSERT ON assessments BEGIN
+    INSERT INTO assessments_fts (rowid, {", ".join(SEARCH_FIELDS)})
+        VALUES (new.id, {_SEARCH_VALUES.format(row="new")});
+END;
+CREATE TRIGGER IF NOT EXISTS assessments_fts_update AFTER UPDATE OF data ON assessments BEGIN
+    DELETE FROM assessments_fts WHERE rowid = old.id;
+    INSERT INTO assessments_fts (rowid, {", ".join(SEARCH_FIELDS)})
+        VALUES (new.id, {_SEARCH_VALUES.format(row="new")});
+END;
+CREATE TRIGGER IF NOT EXISTS assessments_fts_delete AFTER DELETE ON assessments BEGIN
+    DELETE FROM assessments_fts WHERE rowid = old.id;
+END;
+INSERT INTO assessments_fts (rowid, {", ".join(SEARCH_FIELDS)})
+    SELECT id, {_SEARCH_VALUES.format(row="assessments")} FROM assessments
+    WHERE NOT EXISTS (SELECT 1 FROM assessments_fts);
+"""
+
+# Rollup periods and the SQLite expression for the first day of each bucket
+ROLLUP_PERIODS = {
+    "day": "date({row}.timestamp)",
+    "week": "date({row}.timestamp, '-6 days', 'weekday 1')",
+}
+
+
+def _refresh_client(client, delta):
+    """SQL pointing the client_latest row of `client` at its newest assessment
+    and adding `delta` to its assessment count.
+
+    Only index seeks: the newest two rows come from the client history index
+    and the count is adjusted rather than recounted.
+    """
+    sql = f"""
+    INSERT INTO client_latest (client_id, assessment_id, timestamp, risk_level, risk_score, previous_score, assessment_count)
+        SELECT a.client_id, a.id, a.timestamp, a.risk_level, a.risk_score,
+            (SELECT p.risk_score FROM assessments p WHERE p.client_id = a.client_id
+                AND (p.timestamp, p.id) < (a.timestamp, a.id) ORDER BY p.timestamp DESC, p.id DESC LIMIT 1),
+            1
+        FROM assessments a WHERE a.client_id = {client}
+        ORDER BY a.timestamp DESC, a.id DESC LIMIT 1
+        ON CONFLICT (client_id) DO UPDATE SET
+            assessment_id = excluded.assessment_id,
+            timestamp = excluded.timestamp,
+            risk_level = excluded.risk_level,
+            risk_score = excluded.risk_score,
+            previous_score = excluded.previous_score,
+            assessment_count = assessment_count + {delta};"""
+    if delta < 0:
+        # The client's last assessment is gone, so the upsert above matched nothing
+        sql += f"""
+    DELETE FROM client_latest WHERE client_id = {client}
+        AND NOT EXISTS (SELECT 1 FROM assessments WHERE client_id = {client});"""
+    return sql
+
+
+def _rollup(row, sign):
+    """SQL adding (sign "") or removing (sign "-") `row` from every rollup"""
+    return "".join(f"""
+    INSERT INTO risk_rollups (period, bucket, risk_level, assessment_count, score_sum)
+        VALUES ('{period}', coalesce({bucket.format(row=row)}, ''), {row}.risk_level, {sign}1, {sign}{row}.risk_score)
+        ON CONFLICT (period, bucket, risk_level) DO UPDATE SET
+            assessment_count = assessment_count + excluded.assessment_count,
+            score_sum = score_sum + excluded.score_sum;""" for period, bucket in ROLLUP_PERIODS.items())
+
+
+# Latest assessment per client and daily/weekly counts per risk level,
+# maintained incrementally by triggers. Idempotent like SEARCH_SCHEMA.
+HISTORY_SCHEMA = f"""
+CREATE INDEX IF NOT EXISTS idx_assessments_client_history ON assessments (client_id, timestamp, id);
+CREATE TABLE IF NOT EXISTS client_latest (
+    client_id TEXT PRIMARY KEY,
+    assessment_id INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    risk_level TEXT NOT NULL,
+    risk_score REAL NOT NULL,
+    previous_score REAL,
+    assessment_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_client_latest_timestamp ON client_latest (timestamp);
+CREATE INDEX IF NOT EXISTS idx_client_latest_risk_level ON client_latest (risk_level);
+CREATE TABLE IF NOT EXISTS risk_rollups (
+    period TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    risk_level TEXT NOT NULL,
+    assessment_count INTEGER NOT NULL,
+    score_sum REAL NOT NULL,
+    PRIMARY KEY (period, bucket, risk_level)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS assessments_history_insert AFTER INSERT ON assessments BEGIN
+    {_refresh_client("new.client_id", 1)}
+    {_rollup("new", "")}
+END;
+CREATE TRIGGER IF NOT EXISTS assessments_history_update
+AFTER UPDATE OF client_id, timestamp, risk_level, risk_score ON assessments BEGIN
+    {_refresh_client("old.client_id", -1)}
+    {_refresh_client("new.client_id", 1)}
+    {_rollup("old", "-")}
+    {_rollup("new", "")}
+END;
+CREATE TRIGGER IF NOT EXISTS assessments_history_delete AFTER DELETE ON assessments BEGIN
+    {_refresh_client("old.client_id", -1)}
+    {_rollup("old", "-")}
+END;
+INSERT INTO client_latest (client_id, assessment_id, timestamp, risk_level, risk_score, previous_score, assessment_count)
+    SELECT client_id, id, timestamp, risk_level, risk_score, previous_score, assessment_count FROM (
+        SELECT *,
+            lag(risk_score) OVER (PARTITION BY client_id ORDER BY timestamp, id) AS previous_score,
+            count(*) OVER (PARTITION BY client_id) AS assessment_count,
+            row_number() OVER (PARTITION BY client_id ORDER BY timestamp DESC, id DESC) AS recency
+        FROM assessments
+    )
+    WHERE recency = 1 AND NOT EXISTS (SELECT 1 FROM client_latest);
+""" + "".join(f"""
+INSERT INTO risk_rollups (period, bucket, risk_level, assessment_count, score_sum)
+    SELECT '{period}', coalesce({bucket.format(row="assessments")}, ''), risk_level, COUNT(*), SUM(risk_score)
+    FROM assessments WHERE NOT EXISTS (SELECT 1 FROM risk_rollups WHERE period = '{period}')
+    GROUP BY 2, 3;""" for period, bucket in ROLLUP_PERIODS.items())
+
+# Rule configs by version, so re-scoring can tell which rules changed
+RULES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rule_versions (
+    version TEXT PRIMARY KEY,
+    config TEXT NOT NULL,
+    created TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# In-progress wizard drafts, one per client, written by drafts.DraftWriter
+DRAFTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS drafts (
+    client_id TEXT PRIMARY KEY,
+    step INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    saved_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_drafts_saved_at ON drafts (saved_at);
+"""
+
+# Derived tables created (and backfilled) on first open, keyed by a table
+# whose presence shows the script has run
+DERIVED_SCHEMAS = {
+    "assessments_fts": SEARCH_SCHEMA,
+    "risk_rollups": HISTORY_SCHEMA,
+}
+
+
+class DuplicateClientError(ValueError):
+    """Raised under the "reject" policy when a client_id is already stored"""
+
+    def __init__(self, client_ids):
+        self.client_ids = sorted(set(client_ids))
+        super().__init__(f"Client ID already assessed: {', '.join(self.client_ids)}")
+
+
+def search_query(text):
+    """FTS5 query matching every word of `text` as a prefix (None if no words)"""
+    words = re.findall(r"\w+", text or "")
+    return " ".join(f'"{w}"*' for w in words) or None
+
+
+# Storage Interface
+class AssessmentStore:
+    """Base class for assessment storage backends"""
+
+    def add(self, record):
+        """Store a single assessment and return its id"""
+        return self.add_many([record])[0]
+
+    def add_many(self, records):
+        """Store several assessments in one batch and return their ids.
+
+        Records whose client_id is already stored (or repeated in the
+        batch) follow the store's duplicate policy. Under "replace" a
+        record overwrites the client's latest assessment unless its
+        timestamp is older, in which case it is dropped; either way the
+        returned id is that of the assessment kept. Under "reject" nothing
+        is stored and DuplicateClientError is raised.
+        """
+        raise NotImplementedError
+
+    def get(self, record_id):
+        """Return one assessment by id, or None"""
+        raise NotImplementedError
+
+    def update(self, record_id, record):
+        """Replace the assessment stored under `record_id`"""
+        raise NotImplementedError
+
+    def delete(self, record_id):
+        """Delete one assessment by id"""
+        raise NotImplementedError
+
+    def aggregates(self):
+        """Current RiskAggregates for the whole store"""
+        raise NotImplementedError
+
+    def version(self):
+        """Counter that changes whenever the stored data changes"""
+        raise NotImplementedError
+
+    def count(self, risk_levels=None, client_id=None, date_from=None, date_to=None, search=None):
+        """Count assessments matching the given filters"""
+        raise NotImplementedError
+
+    def query(self, risk_levels=None, client_id=None, date_from=None, date_to=None,
+              sort="date", descending=True, limit=50, offset=0, search=None):
+        """Return one filtered, sorted page of assessments.
+
+        `date_from`/`date_to` are inclusive `datetime.date` bounds, `search`
+        is free text matched against SEARCH_FIELDS and `sort` is "date",
+        "score" or "relevance" (best search matches first).
+        """
+        raise NotImplementedError
+
+    def page(self, after_id=None, limit=50, newest_first=True, **filters):
+        """Return up to `limit` assessments following the `after_id` cursor.
+
+        `filters` are the same keyword filters as count(), plus
+        `latest_only` to read only each client's latest assessment.
+        """
+        raise NotImplementedError
+
+    def iter_assessments(self, batch_size=500, newest_first=False, **filters):
+        """Yield every (matching) assessment, reading `batch_size` rows at a time"""
+        after_id = None
+        while True:
+            rows = self.page(after_id=after_id, limit=batch_size, newest_first=newest_first, **filters)
+            if not rows:
+                return
+            yield from rows
+            after_id = rows[-1]["id"]
+
+    def client_history(self, client_id):
+        """Every assessment of one client, oldest first"""
+        raise NotImplementedError
+
+    def latest_for_client(self, client_id):
+        """The latest assessment of one client, or None"""
+        raise NotImplementedError
+
+    def known_clients(self, client_ids):
+        """{client_id: latest assessment id} for those of `client_ids` already stored"""
+        raise NotImplementedError
+
+    def client_aggregates(self):
+        """RiskAggregates over each client's latest assessment only"""
+        raise NotImplementedError
+
+    def latest_per_client(self, risk_levels=None, limit=50, offset=0):
+        """Summaries of each client's latest assessment, most recent first.
+
+        Each summary has client_id, name, assessment_id, timestamp,
+        risk_level, risk_score, previous_score, score_delta and
+        assessment_count. `risk_levels` filters on the latest level.
+        """
+        raise NotImplementedError
+
+    def client_count(self, risk_levels=None):
+        """Number of distinct clients, optionally by latest risk level"""
+        raise NotImplementedError
+
+    def risk_trend(self, period="week", date_from=None, date_to=None):
+        """Assessment counts and average score per risk level per day or week.
+
+        Returns dicts with bucket (first day of the period), risk_level,
+        assessments and average_score, oldest bucket first.
+        """
+        raise NotImplementedError
+
+    # Re-scoring
+    def rule_version_counts(self):
+        """{rule_version: count} of stored results (None for unstamped ones)"""
+        raise NotImplementedError
+
+    def page_by_rule_version(self, rule_version, after_id=None, limit=500):
+        """Up to `limit` assessments stamped with `rule_version`, by id after `after_id`"""
+        raise NotImplementedError
+
+    def save_rescored(self, records, unchanged_ids, rule_version, from_version):
+        """In one transaction, store re-scored `records` and stamp the
+        results of `unchanged_ids` with `rule_version` as they are.
+
+        Rows no longer stamped with `from_version`, or whose inputs no
+        longer match a record's risk_hash, were written since they were
+        read and are skipped. Returns (stored, restamped) counts.
+        """
+        raise NotImplementedError
+
+    def save_rule_config(self, version, config):
+        """Remember the rule config of `version` (first save wins)"""
+        raise NotImplementedError
+
+    def rule_config(self, version):
+        """The saved rule config of `version`, or None"""
+        raise NotImplementedError
+
+    # Drafts
+    def save_drafts(self, drafts):
+        """In one transaction, store {client_id: (step, data, saved_at)} drafts.
+
+        A value of None deletes that client's draft.
+        """
+        raise NotImplementedError
+
+    def draft(self, client_id):
+        """The saved draft of one client as a dict with client_id, step,
+        data and saved_at, or None"""
+        raise NotImplementedError
+
+    def expire_drafts(self, before):
+        """Delete drafts saved before the `before` datetime; returns how many"""
+        raise NotImplementedError
+
+    def clear(self):
+        """Delete every assessment"""
+        raise NotImplementedError
+
+    def __len__(self):
+        return self.count()
+
+    def __bool__(self):
+        return self.count() > 0
+
+
+# SQLite Backend
+class SQLiteAssessmentStore(AssessmentStore):
+    """Durable assessment store backed by SQLite in WAL mode.
+
+    `scorer` is called on each record at write time to fill the indexed
+    risk level and score columns. It must return (score, level, ...).
+    `duplicates` is one of DUPLICATE_POLICIES. Lookups by client_id go
+    through the client_latest primary key, so their cost does not grow
+    with the number of stored assessments.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, scorer=None, duplicates=DEFAULT_DUPLICATE_POLICY):
+        if duplicates not in DUPLICATE_POLICIES:
+            raise ValueError(f"Unknown duplicate policy: {duplicates}")
+        self.path = path
+        self.scorer = scorer
+        self.duplicates = duplicates
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._aggregates = RiskAggregates()
+        self._client_aggregates = RiskAggregates()
+        self._version = 0
+        self._load_aggregates()
+
+    def _migrate(self):
+        """Bring databases created by older versions up to the current schema"""
+        self._conn.executescript(RULES_SCHEMA)
+        self._conn.executescript(DRAFTS_SCHEMA)
+        for table, script in DERIVED_SCHEMAS.items():
+            if not self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (table,)).fetchone():
+                # New or older database: create the derived tables and backfill them
+                self._conn.executescript(f"BEGIN IMMEDIATE;{script}COMMIT;")
+
+    def _data_version(self):
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _load_aggregates(self):
+        """Rebuild the running aggregates with one grouped scan"""
+        self._aggregates.reset()
+        rows = self._conn.execute(
+            "SELECT risk_level, risk_score, COUNT(*) FROM assessments GROUP BY risk_level, risk_score"
+        )
+        for level, score, count in rows:
+            self._aggregates.add(score, level, count)
+        self._client_aggregates.reset()
+        rows = self._conn.execute(
+            "SELECT risk_level, risk_score, COUNT(*) FROM client_latest GROUP BY risk_level, risk_score"
+        )
+        for level, score, count in rows:
+            self._client_aggregates.add(score, level, count)
+        self._seen_version = self._data_version()
+
+    def _row_values(self, record):
+        if self.scorer is not None:
+            score, level = self.scorer(record)[:2]
+        else:
+            score, level = record.get("risk_score", 0), record.get("risk_level", "Low")
+        return (
+            record.get("client_id", ""),
+            record.get("timestamp", ""),
+            level,
+            score,
+            json.dumps(record),
+            record.get("rule_version"),
+        )
+
+    @staticmethod
+    def _to_record(row):
+        record = json.loads(row["data"])
+        record["id"] = row["id"]
+        # Re-scoring restamps results it did not need to change in the column only
+        if row["rule_version"] is not None:
+            record["rule_version"] = row["rule_version"]
+        return record
+
+    def _latest(self, client_id):
+        return self._conn.execute(
+            "SELECT assessment_id, timestamp, risk_score, risk_level FROM client_latest WHERE client_id = ?",
+            (client_id,),
+        ).fetchone()
+
+    def _track_latest(self, client_ids, write):
+        """Run `write`, moving the clients' totals from their old latest assessment to the new one"""
+        client_ids = list(dict.fromkeys(client_ids))
+        before = [self._latest(c) for c in client_ids]
+        result = write()
+        for old in before:
+            if old is not None:
+                self._client_aggregates.remove(old["risk_score"], old["risk_level"])
+        for client_id in client_ids:
+            new = self._latest(client_id)
+            if new is not None:
+                self._client_aggregates.add(new["risk_score"], new["risk_level"])
+        return result
+
+    def _insert_row(self, row):
+        cur = self._conn.execute(
+            "INSERT INTO assessments (client_id, timestamp, risk_level, risk_score, data, rule_version) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            row,
+        )
+        self._aggregates.add(row[3], row[2])
+        return cur.lastrowid
+
+    def add_many(self, records):
+        rows = [self._row_values(r) for r in records]
+        ids = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self.duplicates == "reject":
+                    counts = Counter(row[0] for row in rows)
+                    duplicates = {c for c, n in counts.items() if n > 1} | set(self._known_clients(counts))
+                    if duplicates:
+                        raise DuplicateClientError(duplicates)
+                for row in rows:
+                    latest = self._latest(row[0]) if self.duplicates == "replace" else None
+                    if latest is not None:
+                        # A late-arriving older assessment must not overwrite a newer one
+                        if row[1] >= latest["timestamp"]:
+                            self._update_row(latest["assessment_id"], row)
+                        ids.append(latest["assessment_id"])
+                    else:
+                        ids.append(self._track_latest([row[0]], partial(self._insert_row, row)))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                # The running totals may have been adjusted for rolled-back rows
+                self._load_aggregates()
+                raise
+            self._version += 1
+        return ids
+
+    def _update_row(self, record_id, row):
+        old = self._conn.execute(
+            "SELECT client_id, risk_score, risk_level FROM assessments WHERE id = ?", (record_id,)
+        ).fetchone()
+        if old is None:
+            raise KeyError(record_id)
+        self._track_latest([old["client_id"], row[0]], partial(
+            self._conn.execute,
+            "UPDATE assessments SET client_id = ?, timestamp = ?, risk_level = ?, risk_score = ?, data = ?, "
+            "rule_version = ? WHERE id = ?",
+            row + (record_id,),
+        ))
+        self._aggregates.replace(old["risk_score"], old["risk_level"], row[3], row[2])
+
+    def update(self, record_id, record):
+        row = self._row_values(record)
+        with self._lock:
+            self._update_row(record_id, row)
+            self._version += 1
+
+    def delete(self, record_id):
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT client_id, risk_score, risk_level FROM assessments WHERE id = ?", (record_id,)
+            ).fetchone()
+            if old is None:
+                return
+            self._track_latest([old["client_id"]], partial(
+                self._conn.execute, "DELETE FROM assessments WHERE id = ?", (record_id,)
+            ))
+            self._aggregates.remove(old["risk_score"], old["risk_level"])
+            self._version += 1
+
+    def _sync(self):
+        # data_version only changes when another connection commits, so the
+        # running totals are reloaded only after writes by other processes
+        if self._data_version() != self._seen_version:
+            self._load_aggregates()
+            self._version += 1
+
+    def aggregates(self):
+        with self._lock:
+            self._sync()
+            return self._aggregates
+
+    def client_aggregates(self):
+        with self._lock:
+            self._sync()
+            return self._client_aggregates
+
+    def version(self):
+        with self._lock:
+            self._sync()
+            return self._version
+
+    def get(self, record_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, data, rule_version FROM assessments WHERE id = ?", (record_id,)
+            ).fetchone()
+        return self._to_record(row) if row else None
+
+    @staticmethod
+    def _where(risk_levels=None, client_id=None, date_from=None, date_to=None, search=None, latest_only=False):
+        clauses, params = [], []
+        if latest_only:
+            clauses.append("id IN (SELECT assessment_id FROM client_latest)")
+        match = search_query(search)
+        if match:
+            clauses.append("id IN (SELECT rowid FROM assessments_fts WHERE assessments_fts MATCH ?)")
+            params.append(match)
+        if risk_levels:
+            clauses.append(f"risk_level IN ({','.join('?' * len(risk_levels))})")
+            params.extend(risk_levels)
+        if client_id:
+            clauses.append("client_id = ?")
+            params.append(client_id)
+        if date_from:
+            clauses.append("timestamp >= ?")
+            params.append(date_from.strftime("%Y-%m-%d"))
+        if date_to:
+            clauses.append("timestamp < ?")
+            params.append((date_to + timedelta(days=1)).strftime("%Y-%m-%d"))
+        sql = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return sql, params
+
+    def count(self, risk_levels=None, client_id=None, date_from=None, date_to=None, search=None):
+        where, params = self._where(risk_levels, client_id, date_from, date_to, search)
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM assessments" + where, params).fetchone()[0]
+
+    def query(self, risk_levels=None, client_id=None, date_from=None, date_to=None,
+              sort="date", descending=True, limit=50, offset=0, search=None):
+        match = search_query(search)
+        order = "DESC" if descending else "ASC"
+        if sort == "relevance" and match:
+            # Rank by bm25 over the matching index rows, best first
+            where, params = self._where(risk_levels, client_id, date_from, date_to)
+            sql = (
+                "SELECT id, data, rule_version FROM (SELECT rowid AS match_id, rank AS match_rank FROM assessments_fts "
+                f"WHERE assessments_fts MATCH ?) JOIN assessments ON id = match_id{where} "
+                "ORDER BY match_rank, id DESC LIMIT ? OFFSET ?"
+            )
+            params.insert(0, match)
+        else:
+            where, params = self._where(risk_levels, client_id, date_from, date_to, search)
+            sql = (
+                f"SELECT id, data, rule_version FROM assessments{where} "
+                f"ORDER BY {SORT_COLUMNS[sort]} {order}, id {order} LIMIT ? OFFSET ?"
+            )
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit, offset]).fetchall()
+        return [self._to_record(r) for r in rows]
+
+    def page(self, after_id=None, limit=50, newest_first=True, **filters):
+        op, order = ("<", "DESC") if newest_first else (">", "ASC")
+        where, params = self._where(**filters)
+        if after_id is not None:
+            where += f" {'AND' if where else 'WHERE'} id {op} ?"
+            params.append(after_id)
+        sql = f"SELECT id, data, rule_version FROM assessments{where} ORDER BY id {order} LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._to_record(r) for r in rows]
+
+    def client_history(self, client_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, data, rule_version FROM assessments WHERE client_id = ? ORDER BY timestamp, id", (client_id,)
+            ).fetchall()
+        return [self._to_record(r) for r in rows]
+
+    def latest_for_client(self, client_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT a.id, a.data, a.rule_version FROM client_latest l JOIN assessments a ON a.id = l.assessment_id "
+                "WHERE l.client_id = ?", (client_id,)
+            ).fetchone()
+        return self._to_record(row) if row else None
+
+    def _known_clients(self, client_ids):
+        known = {}
+        for client_id in set(client_ids):
+            latest = self._latest(client_id)
+            if latest is not None:
+                known[client_id] = latest["assessment_id"]
+        return known
+
+    def known_clients(self, client_ids):
+        with self._lock:
+            return self._known_clients(client_ids)
+
+    @staticmethod
+    def _latest_where(risk_levels):
+        if not risk_levels:
+            return "", []
+        return f" WHERE l.risk_level IN ({','.join('?' * len(risk_levels))})", list(risk_levels)
+
+    def latest_per_client(self, risk_levels=None, limit=50, offset=0):
+        where, params = self._latest_where(risk_levels)
+        sql = (
+            "SELECT l.client_id, json_extract(a.data, '$.first_name') || ' ' || json_extract(a.data, '$.last_name') AS name, "
+            "l.assessment_id, l.timestamp, l.risk_level, l.risk_score, l.previous_score, "
+            "l.risk_score - l.previous_score AS score_delta, l.assessment_count "
+            f"FROM client_latest l JOIN assessments a ON a.id = l.assessment_id{where} "
+            "ORDER BY l.timestamp DESC, l.assessment_id DESC LIMIT ? OFFSET ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit, offset]).fetchall()
+        return [dict(r) for r in rows]
+
+    def client_count(self, risk_levels=None):
+        where, params = self._latest_where(risk_levels)
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM client_latest l" + where, params).fetchone()[0]
+
+    def risk_trend(self, period="week", date_from=None, date_to=None):
+        if period not in ROLLUP_PERIODS:
+            raise ValueError(f"Unknown rollup period: {period}")
+        sql = (
+            "SELECT bucket, risk_level, assessment_count AS assessments, score_sum / assessment_count AS average_score "
+            "FROM risk_rollups WHERE period = ? AND assessment_count > 0 AND bucket != ''"
+        )
+        params = [period]
+        if date_from:
+            sql += " AND bucket >= ?"
+            params.append(date_from.strftime("%Y-%m-%d"))
+        if date_to:
+            sql += " AND bucket <= ?"
+            params.append(date_to.strftime("%Y-%m-%d"))
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY bucket, risk_level", params).fetchall()
+        return [dict(r) for r in rows]
+
+    def rule_version_counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT rule_version, COUNT(*) FROM assessments GROUP BY rule_version")
+            return {version: count for version, count in rows}
+
+    def page_by_rule_version(self, rule_version, after_id=None, limit=500):
+        sql = "SELECT id, data, rule_version FROM assessments WHERE rule_version IS ?"
+        params = [rule_version]
+        if after_id is not None:
+            sql += " AND id > ?"
+            params.append(after_id)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY id LIMIT ?", params + [limit]).fetchall()
+        return [self._to_record(r) for r in rows]
+
+    def save_rescored(self, records, unchanged_ids, rule_version, from_version):
+        rows = [(r["id"], r["risk_hash"], self._row_values(r)) for r in records]
+        stored = restamped = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for record_id, risk_hash, row in rows:
+                    # Re-read under the write lock: an edit or delete since the
+                    # page was read wins over the re-scored copy
+                    current = self._conn.execute(
+                        "SELECT rule_version, json_extract(data, '$.risk_hash') AS risk_hash, data "
+                        "FROM assessments WHERE id = ?", (record_id,)
+                    ).fetchone()
+                    if current is None or current["rule_version"] != from_version:
+                        continue
+                    # Rows stored before results were hashed are hashed here
+                    if (current["risk_hash"] or risk_input_hash(json.loads(current["data"]))) != risk_hash:
+                        continue
+                    self._update_row(record_id, row)
+                    stored += 1
+                if unchanged_ids:
+                    restamped = self._conn.execute(
+                        f"UPDATE assessments SET rule_version = ? WHERE rule_version IS ? "
+                        f"AND id IN ({','.join('?' * len(unchanged_ids))})",
+                        [rule_version, from_version, *unchanged_ids],
+                    ).rowcount
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                # The running totals may have been adjusted for rolled-back rows
+                self._load_aggregates()
+                raise
+            self._version += 1
+        return stored, restamped
+
+    def save_rule_config(self, version, config):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO rule_versions (version, config) VALUES (?, ?)", (version, json.dumps(config))
+            )
+
+    def rule_config(self, version):
+        with self._lock:
+            row = self._conn.execute("SELECT config FROM rule_versions WHERE version = ?", (version,)).fetchone()
+        return json.loads(row["config"]) if row else None
+
+    def save_drafts(self, drafts):
+        saved, deleted = [], []
+        for client_id, draft in drafts.items():
+            if draft is None:
+                deleted.append((client_id,))
+            else:
+                step, data, saved_at = draft
+                saved.append((client_id, step, json.dumps(data), saved_at.strftime("%Y-%m-%d %H:%M:%S")))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO drafts (client_id, step, data, saved_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (client_id) DO UPDATE SET step = excluded.step, data = excluded.data, "
+                    "saved_at = excluded.saved_at",
+                    saved,
+                )
+                self._conn.executemany("DELETE FROM drafts WHERE client_id = ?", deleted)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def draft(self, client_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM drafts WHERE client_id = ?", (client_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "client_id": row["client_id"],
+            "step": row["step"],
+            "data": json.loads(row["data"]),
+            "saved_at": datetime.strptime(row["saved_at"], "%Y-%m-%d %H:%M:%S"),
+        }
+
+    def expire_drafts(self, before):
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM drafts WHERE saved_at < ?", (before.strftime("%Y-%m-%d %H:%M:%S"),)
+            ).rowcount
+
+    def clear(self):
+        with self._lock:
+            # Empty the derived tables directly rather than through one
+            # trigger firing per deleted row, then put the triggers back
+            triggers = [r[0] for r in self._conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'assessments'"
+            )]
+            drops = "".join(f"DROP TRIGGER IF EXISTS {name};" for name in triggers)
+            try:
+                self._conn.executescript(
+                    f"BEGIN IMMEDIATE;{drops}"
+                    "DELETE FROM assessments; DELETE FROM assessments_fts;"
+                    "DELETE FROM client_latest; DELETE FROM risk_rollups;"
+                    f"{SEARCH_SCHEMA}{HISTORY_SCHEMA}COMMIT;"
+                )
+            except Exception:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+            self._aggregates.reset()
+            self._client_aggregates.reset()
+            self._version += 1
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Shared Read Cache
+class SharedAssessmentStore(AssessmentStore):
+    """Process-wide, thread-safe caching layer over another store.
+
+    One instance is shared by every session. Read results are cached until
+    the backend's version() changes, so sessions paging through unchanged
+    data share one in-memory copy instead of each querying the backend.
+    Cached records are shared between sessions and must not be mutated.
+    """
+
+    def __init__(self, backend, max_entries=256):
+        self.backend = backend
+        self.duplicates = getattr(backend, "duplicates", "append")
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        self._cache = OrderedDict()
+        self._cached_version = None
+
+    def _cached(self, key, load):
+        with self._lock:
+            current = self.backend.version()
+            if current != self._cached_version:
+                self._cache.clear()
+                self._cached_version = current
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        value = load()
+        with self._lock:
+            if self._cached_version == current:
+                self._cache[key] = value
+                if len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return value
+
+    def _write(self, fn, *args):
+        with self._lock:
+            result = fn(*args)
+            self._cache.clear()
+            self._cached_version = None
+            return result
+
+    def add_many(self, records):
+        return self._write(self.backend.add_many, records)
+
+    def update(self, record_id, record):
+        return self._write(self.backend.update, record_id, record)
+
+    def delete(self, record_id):
+        return self._write(self.backend.delete, record_id)
+
+    def clear(self):
+        return self._write(self.backend.clear)
+
+    def save_rescored(self, records, unchanged_ids, rule_version, from_version):
+        return self._write(self.backend.save_rescored, records, unchanged_ids, rule_version, from_version)
+
+    def save_rule_config(self, version, config):
+        return self.backend.save_rule_config(version, config)
+
+    def rule_config(self, version):
+        return self.backend.rule_config(version)
+
+    def rule_version_counts(self):
+        return self.backend.rule_version_counts()
+
+    # Drafts change on every wizard step and are read once per resume, so
+    # they bypass the cache and leave the assessment version alone
+    def save_drafts(self, drafts):
+        return self.backend.save_drafts(drafts)
+
+    def draft(self, client_id):
+        return self.backend.draft(client_id)
+
+    def expire_drafts(self, before):
+        return self.backend.expire_drafts(before)
+
+    def page_by_rule_version(self, rule_version, after_id=None, limit=500):
+        # Read by the re-scoring job only, so not cached
+        return self.backend.page_by_rule_version(rule_version, after_id, limit)
+
+    def get(self, record_id):
+        return self._cached(("get", record_id), lambda: self.backend.get(record_id))
+
+    def count(self, risk_levels=None, client_id=None, date_from=None, date_to=None, search=None):
+        key = ("count", tuple(risk_levels or ()), client_id, date_from, date_to, search)
+        return self._cached(key, lambda: self.backend.count(risk_levels, client_id, date_from, date_to, search))
+
+    def query(self, risk_levels=None, client_id=None, date_from=None, date_to=None,
+              sort="date", descending=True, limit=50, offset=0, search=None):
+        key = ("query", tuple(risk_levels or ()), client_id, date_from, date_to, sort, descending, limit, offset, search)
+        return self._cached(key, lambda: self.backend.query(
+            risk_levels, client_id, date_from, date_to, sort, descending, limit, offset, search,
+        ))
+
+    def page(self, after_id=None, limit=50, newest_first=True, **filters):
+        # Cursor reads are used for streaming exports, so they bypass the cache
+        return self.backend.page(after_id, limit, newest_first, **filters)
+
+    def client_history(self, client_id):
+        return self._cached(("client_history", client_id), lambda: self.backend.client_history(client_id))
+
+    def latest_for_client(self, client_id):
+        return self._cached(("latest_for_client", client_id), lambda: self.backend.latest_for_client(client_id))
+
+    def known_clients(self, client_ids):
+        # Checked right before writes, so never served from the cache
+        return self.backend.known_clients(client_ids)
+
+    def latest_per_client(self, risk_levels=None, limit=50, offset=0):
+        key = ("latest_per_client", tuple(risk_levels or ()), limit, offset)
+        return self._cached(key, lambda: self.backend.latest_per_client(risk_levels, limit, offset))
+
+    def client_count(self, risk_levels=None):
+        key = ("client_count", tuple(risk_levels or ()))
+        return self._cached(key, lambda: self.backend.client_count(risk_levels))
+
+    def risk_trend(self, period="week", date_from=None, date_to=None):
+        key = ("risk_trend", period, date_from, date_to)
+        return self._cached(key, lambda: self.backend.risk_trend(period, date_from, date_to))
+
+    def aggregates(self):
+        return self.backend.aggregates()
+
+    def client_aggregates(self):
+        return self.backend.client_aggregates()
+
+    def version(self):
+        return self.backend.version()
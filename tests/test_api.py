@@ -0,0 +1,117 @@
+import asyncio
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+from api import AssessmentAPI
+from benchmarks.synthetic import generate_assessments
+from scoring import assessment_risk, with_risk
+from storage import SQLiteAssessmentStore
+
+SEEDED = 20
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Port of an API server on its own event loop thread, over a store of SEEDED assessments"""
+    store = SQLiteAssessmentStore(str(tmp_path / "api.db"), scorer=assessment_risk)
+    store.add_many([with_risk(a) for a in generate_assessments(SEEDED, seed=2)])
+    api = AssessmentAPI(store, workers=1)
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(asyncio.start_server(api.handle_connection, "127.0.0.1", 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield server.sockets[0].getsockname()[1]
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    server.close()
+    loop.run_until_complete(server.wait_closed())
+    loop.close()
+    api.close()
+    store.close()
+
+
+def request(port, method, path, payload=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    body = json.dumps(payload) if payload is not None else None
+    conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    data = response.read()
+    conn.close()
+    return response, data
+
+
+def call(port, method, path, payload=None):
+    response, data = request(port, method, path, payload)
+    return response.status, json.loads(data)
+
+
+def assessment(**fields):
+    return {**generate_assessments(1, seed=9)[0], "timestamp": "", **fields}
+
+
+def test_score_does_not_store(server):
+    status, result = call(server, "POST", "/score", assessment())
+    assert status == 200
+    assert result["risk_score"] >= 0 and result["risk_level"]
+    assert call(server, "GET", "/assessments")[1]["total"] == SEEDED
+
+
+def test_submit_then_find_by_search_and_client(server):
+    status, created = call(server, "POST", "/assessments", assessment(client_id="CLAPI01", last_name="Zyzzyva"))
+    assert status == 201
+
+    status, page = call(server, "GET", "/assessments?q=zyzz")
+    assert status == 200
+    assert [item["id"] for item in page["items"]] == [created["id"]]
+
+    status, latest = call(server, "GET", "/clients/CLAPI01")
+    assert (status, latest["id"]) == (200, created["id"])
+    assert call(server, "GET", "/clients/CLNOBODY")[0] == 404
+
+    status, record = call(server, "GET", f"/assessments/{created['id']}")
+    assert (status, record["client_id"], record["risk_score"]) == (200, "CLAPI01", created["risk_score"])
+    assert call(server, "GET", "/assessments/999999")[0] == 404
+    assert call(server, "POST", "/assessments", assessment(age=""))[0] == 422
+
+
+def test_list_sorts_and_limits(server):
+    status, page = call(server, "GET", "/assessments?sort=score&order=asc&limit=5")
+    assert status == 200
+    assert (page["total"], page["limit"], len(page["items"])) == (SEEDED, 5, 5)
+    scores = [item["risk_score"] for item in page["items"]]
+    assert scores == sorted(scores)
+    assert call(server, "GET", "/assessments?limit=-1")[1]["limit"] == 1
+    assert call(server, "GET", "/assessments?sort=name")[0] == 400
+
+
+def test_batch_reports_rejected_rows(server):
+    rows = [assessment(client_id="CLBATCH1"), assessment(client_id="CLBATCH2", age=""), "not an object"]
+    status, result = call(server, "POST", "/assessments/batch", rows)
+    assert status == 200
+    assert (result["imported"], result["rejected"]) == (1, 2)
+    assert [r["row"] for r in result["results"]] == [1]
+    assert [(e["row"], e["client_id"]) for e in result["errors"]] == [(2, "CLBATCH2"), (3, "")]
+
+
+def test_export_streams_every_assessment_chunked(server):
+    response, data = request(server, "GET", "/export.ndjson")
+    assert response.status == 200
+    assert response.getheader("Transfer-Encoding") == "chunked"
+    assert len([json.loads(line) for line in data.splitlines()]) == SEEDED
+
+
+def test_export_to_http_1_0_client_is_unchunked_until_close(server):
+    with socket.create_connection(("127.0.0.1", server), timeout=30) as sock:
+        sock.sendall(b"GET /export.ndjson HTTP/1.0\r\n\r\n")
+        received = b""
+        while chunk := sock.recv(65536):
+            received += chunk
+    head, _, body = received.partition(b"\r\n\r\n")
+    headers = head.decode("latin-1").lower()
+    assert "transfer-encoding" not in headers
+    assert "connection: close" in headers
+    assert len([json.loads(line) for line in body.splitlines()]) == SEEDED
@@ -0,0 +1,89 @@
+import gzip
+import io
+import json
+import os
+import zipfile
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest, app_test
+
+import storage
+from pdf_report import report_file_name
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "risk_app.py")
+SEEDED = 12
+
+
+class RecordingMediaFileManager(app_test.MediaFileManager):
+    """The media file manager of the last app run, kept so deferred downloads can be run"""
+
+    last = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        RecordingMediaFileManager.last = self
+
+
+def assessment(number):
+    return {
+        "first_name": "Test", "last_name": f"Client{number}", "client_id": f"CL{number:06d}",
+        "age": str(60 + number), "height": "5'6\"", "weight": "150",
+        "diagnoses": "No", "diagnoses_details": "", "seizures": "No", "seizure_frequency": "",
+        "seizure_type": "", "seizure_severity": "", "medications": "Yes", "medication_details": "Metformin",
+        "assist_medical": "No", "additional_notes": "", "timestamp": f"2025-01-{number + 1:02d} 09:00:00",
+    }
+
+
+@pytest.fixture
+def admin_page(tmp_path, monkeypatch):
+    path = str(tmp_path / "app.db")
+    store = storage.SQLiteAssessmentStore(path)
+    store.add_many([assessment(n) for n in range(SEEDED)])
+    store.close()
+    # risk_app reads the path from storage each time the script runs
+    monkeypatch.setattr(storage, "DEFAULT_DB_PATH", path)
+    monkeypatch.setattr(app_test, "MediaFileManager", RecordingMediaFileManager)
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+    at = AppTest.from_file(APP_PATH, default_timeout=30)
+    at.session_state["page"] = "admin"
+    yield at
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+
+def _download(at, label):
+    """Run the callable behind a deferred download button and return its bytes"""
+    button = next(b for b in at.get("download_button") if b.proto.label.startswith(label))
+    manager = RecordingMediaFileManager.last
+    url = manager.execute_deferred(button.proto.deferred_file_id)
+    return manager._storage.get_file(url.rsplit("/", 1)[-1]).content
+
+
+def test_export_buttons_download_every_assessment(admin_page):
+    at = admin_page.run()
+    assert not at.exception
+
+    rows = json.loads(_download(at, "📥 Export All (JSON)"))
+    assert sorted(row["client_id"] for row in rows) == [assessment(n)["client_id"] for n in range(SEEDED)]
+
+    summary = _download(at, "📊 Export Summary (CSV)").decode("utf-8").splitlines()
+    assert len(summary) == SEEDED + 1
+
+    at.radio(key="export_format").set_value("NDJSON").run()
+    lines = _download(at, "📥 Export All (NDJSON)").splitlines()
+    assert [json.loads(line)["client_id"] for line in lines] == [row["client_id"] for row in rows]
+
+    at.checkbox(key="export_gzip").check().run()
+    assert gzip.decompress(_download(at, "📥 Export All (NDJSON)")).splitlines() == lines
+
+
+def test_reports_zip_button_bundles_every_report(admin_page):
+    at = admin_page.run()
+    assert not at.exception
+
+    with zipfile.ZipFile(io.BytesIO(_download(at, "🗂️ Download"))) as bundle:
+        names = bundle.namelist()
+    assert sorted(names) == sorted(report_file_name(assessment(n)) for n in range(SEEDED))
@@ -0,0 +1,83 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from drafts import DraftWriter
+from storage import SQLiteAssessmentStore
+
+# Long enough that the background thread never flushes during a test
+NO_AUTOFLUSH = 60
+SHORT_TTL = timedelta(milliseconds=20)
+
+
+class RecordingStore:
+    """Just the draft methods of a store, remembering every batch written"""
+
+    def __init__(self):
+        self.batches = []
+
+    def save_drafts(self, drafts):
+        self.batches.append(dict(drafts))
+
+    def draft(self, client_id):
+        return None
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteAssessmentStore(str(tmp_path / "drafts.db"))
+    yield store
+    store.close()
+
+
+def test_saves_coalesce_into_one_batch_per_flush():
+    store = RecordingStore()
+    writer = DraftWriter(store, delay=NO_AUTOFLUSH)
+    for step in range(1, 5):
+        for client_id in ("A", "B", "C"):
+            writer.save(client_id, step, {"client_id": client_id, "step": step})
+    writer.discard("C")
+
+    assert writer.flush() == 3
+    assert len(store.batches) == 1
+    batch = store.batches[0]
+    assert batch["C"] is None
+    assert {client_id: batch[client_id][0] for client_id in ("A", "B")} == {"A": 4, "B": 4}
+    assert writer.flush() == 0
+
+
+def test_load_prefers_pending_draft_over_stored(store):
+    writer = DraftWriter(store, delay=NO_AUTOFLUSH)
+    writer.save("A", 2, {"client_id": "A", "first_name": "Ann"})
+    writer.flush()
+    writer.save("A", 3, {"client_id": "A", "first_name": "Anne"})
+
+    step, data, _ = writer.load("A")
+    assert (step, data["first_name"]) == (3, "Anne")
+    writer.discard("A")
+    assert writer.load("A") is None
+    writer.flush()
+    assert store.draft("A") is None
+
+
+def test_expired_pending_draft_is_not_resumed():
+    writer = DraftWriter(RecordingStore(), delay=NO_AUTOFLUSH, ttl=SHORT_TTL)
+    writer.save("A", 2, {"client_id": "A"})
+    assert writer.load("A") is not None
+    time.sleep(SHORT_TTL.total_seconds() * 2)
+    assert writer.load("A") is None
+
+
+def test_expired_stored_draft_is_not_resumed_and_is_deleted(store):
+    writer = DraftWriter(store, delay=NO_AUTOFLUSH)
+    store.save_drafts({
+        "old": (2, {"client_id": "old"}, datetime.now() - writer.ttl - timedelta(minutes=1)),
+        "new": (3, {"client_id": "new"}, datetime.now()),
+    })
+
+    assert writer.load("old") is None
+    assert writer.load("new")[0] == 3
+    assert writer.expire() == 1
+    assert store.draft("old") is None
+    assert store.draft("new") is not None
@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from benchmarks.synthetic import generate_assessments
+from scoring import calculate_risk_score, calculate_risk_scores_batch
+from validation import FREQUENCY_OPTIONS, SEVERITY_OPTIONS
+
+# Values the wizard never produces, so the batch parser's edge cases get hit
+ODD_NUMBERS = ["", " ", "n/a", "74.5", "-3", "1e3", "0", "65", "66", "75", "76", "85", "86", "99", "100", "250", "251"]
+ODD_TEXT = ["", "HEART failure", "stroke-like", "cancer, diabetes", "Diabetic", "none", "é"]
+
+
+def _fuzzed(rng, record):
+    record = dict(record)
+    if rng.random() < 0.3:
+        record["age"] = rng.choice(ODD_NUMBERS)
+    if rng.random() < 0.3:
+        record["weight"] = rng.choice(ODD_NUMBERS)
+    if rng.random() < 0.2:
+        record["diagnoses"] = rng.choice(["Yes", "No", ""])
+        record["diagnoses_details"] = rng.choice(ODD_TEXT)
+    if rng.random() < 0.2:
+        record["seizures"] = rng.choice(["Yes", "No"])
+        record["seizure_frequency"] = rng.choice(FREQUENCY_OPTIONS + [""])
+        record["seizure_severity"] = rng.choice(SEVERITY_OPTIONS + [""])
+    return record
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_batch_matches_scalar_on_randomized_inputs(seed):
+    rng = random.Random(seed)
+    records = [_fuzzed(rng, r) for r in generate_assessments(2000, seed=seed)]
+    batch = calculate_risk_scores_batch(records)
+    assert len(batch) == len(records)
+    for record, result in zip(records, batch):
+        score, level, factors = calculate_risk_score(record)
+        assert result == (score, level, list(factors)), record
+
+
+def test_batch_of_nothing_is_empty():
+    assert calculate_risk_scores_batch([]) == []
@@ -0,0 +1,88 @@
+import pytest
+
+from benchmarks.synthetic import generate_assessments
+from rescore import RescoreJob
+from scoring import RULES, assessment_risk, with_risk
+from storage import SQLiteAssessmentStore
+
+
+@pytest.fixture
+def open_store(tmp_path):
+    stores = []
+
+    def open_store(duplicates="append"):
+        store = SQLiteAssessmentStore(str(tmp_path / "store.db"), scorer=assessment_risk, duplicates=duplicates)
+        stores.append(store)
+        return store
+
+    yield open_store
+    for store in stores:
+        store.close()
+
+
+def assessment(client_id, timestamp="2025-01-01 09:00:00", **fields):
+    record = generate_assessments(1, seed=5)[0]
+    record.update({"client_id": client_id, "timestamp": timestamp, "additional_notes": "", **fields})
+    return with_risk(record)
+
+
+def test_search_matches_word_prefixes_and_ranks_names_first(open_store):
+    store = open_store()
+    note, name, _ = store.add_many([
+        assessment("CL000001", first_name="Ann", last_name="Lee", additional_notes="Uses a walker indoors"),
+        assessment("CL000002", first_name="Bob", last_name="Walker"),
+        assessment("CL000003", first_name="Cy", last_name="Smith"),
+    ])
+
+    assert store.count(search="walk") == 2
+    found = store.query(search="walk", sort="relevance")
+    assert [r["id"] for r in found] == [name, note]
+    assert [r["id"] for r in store.query(search="walker indoors")] == [note]
+    assert store.count(search="zzz") == 0
+
+
+def test_clear_leaves_derived_tables_maintained(open_store):
+    store = open_store()
+    store.add_many([assessment("CL000001"), assessment("CL000001", "2025-01-02 09:00:00")])
+    store.clear()
+    assert store.client_count() == 0
+    assert store.risk_trend("day") == []
+
+    first = store.add(assessment("CL000009", last_name="Quinn"))
+    second = store.add(assessment("CL000009", "2025-01-03 09:00:00"))
+    assert [r["id"] for r in store.query(search="quinn")] == [first]
+    [client] = store.latest_per_client()
+    assert (client["assessment_id"], client["assessment_count"]) == (second, 2)
+    assert sum(row["assessments"] for row in store.risk_trend("day")) == 2
+
+    store.delete(second)
+    [client] = store.latest_per_client()
+    assert (client["assessment_id"], client["assessment_count"]) == (first, 1)
+    store.delete(first)
+    assert store.latest_per_client() == []
+
+
+def test_replace_keeps_newer_assessment_over_late_older_one(open_store):
+    store = open_store(duplicates="replace")
+    newer = store.add(assessment("CL000001", "2025-03-01 09:00:00", last_name="Newer"))
+    assert store.add(assessment("CL000001", "2025-01-01 09:00:00", last_name="Older")) == newer
+
+    [record] = store.client_history("CL000001")
+    assert (record["id"], record["last_name"]) == (newer, "Newer")
+    newest = store.add(assessment("CL000001", "2025-04-01 09:00:00", last_name="Newest"))
+    assert newest == newer
+    assert store.latest_for_client("CL000001")["last_name"] == "Newest"
+    assert store.aggregates().total == 1
+
+
+def test_rescore_hashes_and_rescores_rows_stored_before_hashing(open_store):
+    store = open_store()
+    legacy = generate_assessments(1, seed=7)[0]
+    legacy.update(risk_score=0, risk_level="Low", risk_factors=[])
+    record_id = store.add(legacy)
+
+    job = RescoreJob(store).run()
+    assert (job.rescored, job.skipped) == (1, 0)
+    stored = store.get(record_id)
+    assert stored["rule_version"] == RULES.version
+    assert stored["risk_hash"]
@@ -0,0 +1,65 @@
+ASSESSMENT_FIELDS = (
+    "first_name", "last_name", "client_id",
+    "age", "height", "weight",
+    "diagnoses", "diagnoses_details",
+    "seizures", "seizure_frequency",
+    "seizure_type", "seizure_severity",
+    "medications", "medication_details",
+    "assist_medical", "additional_notes",
+    "timestamp",
+)
+YES_NO_FIELDS = ("diagnoses", "seizures", "medications", "assist_medical")
+
+# Required fields per wizard step
+STEP_REQUIRED_FIELDS = {
+    1: ("first_name", "last_name", "client_id"),
+    2: ("age", "height", "weight"),
+}
+
+FREQUENCY_PLACEHOLDER = "Select frequency"
+SEVERITY_PLACEHOLDER = "Select type"
+FREQUENCY_OPTIONS = [
+    FREQUENCY_PLACEHOLDER, "Daily or multiple times per day", "Weekly",
+    "Monthly", "Less than monthly", "Rare/controlled",
+]
+SEVERITY_OPTIONS = [
+    SEVERITY_PLACEHOLDER, "Grand mal/Tonic-clonic (severe)", "Moderate (loss of consciousness)",
+    "Mild (absence/petit mal)", "Controlled with medication",
+]
+
+
+def blank_assessment():
+    """Empty assessment with the wizard's default answers"""
+    data = dict.fromkeys(ASSESSMENT_FIELDS, "")
+    data.update(dict.fromkeys(YES_NO_FIELDS, "No"))
+    return data
+
+
+def step_complete(data, step):
+    """True when every required field for a wizard step is filled in"""
+    return all(data.get(field) for field in STEP_REQUIRED_FIELDS.get(step, ()))
+
+
+def seizure_details_complete(data):
+    """Seizure frequency and severity must be chosen when seizures are reported"""
+    if data.get("seizures") != "Yes":
+        return True
+    return (
+        data.get("seizure_frequency") not in ("", None, FREQUENCY_PLACEHOLDER)
+        and data.get("seizure_severity") not in ("", None, SEVERITY_PLACEHOLDER)
+    )
+
+
+def validate_assessment(data):
+    """Return a list of error messages using the wizard's rules (empty if valid)"""
+    errors = []
+    for fields in STEP_REQUIRED_FIELDS.values():
+        missing = [f for f in fields if not data.get(f)]
+        if missing:
+            errors.append(f"Missing required field(s): {', '.join(missing)}")
+    for field in YES_NO_FIELDS:
+        if data.get(field) not in ("Yes", "No"):
+            errors.append(f"{field} must be Yes or No")
+    if not seizure_details_complete(data):
+        errors.append("Seizure frequency and severity are required when seizures is Yes")
+    return errors